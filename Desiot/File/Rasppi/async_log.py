@@ -0,0 +1,148 @@
+# ==========================================
+# ASYNC LOGGING (Queue + Background Writer)
+# ==========================================
+# Flask handlers, the capture/vision threads and UART code only put a record
+# on a queue; one listener thread formats and writes it, so a slow terminal
+# or SSH session never stalls the robot loop.
+#
+#   from async_log import get_logger
+#   log = get_logger("demo")
+#   log.info("⚡ Sent to ESP32", command="T")
+#   log.sampled("loop_error", 5.0, "⚠️ Loop Error", logging.ERROR, exc_info=True)
+#
+# LOG_LEVEL (DEBUG/INFO/WARNING/ERROR) applies to get_logger() loggers;
+# werkzeug/ultralytics and other libraries log WARNING and up.
+# LOG_FORMAT=json writes one JSON object per line.
+#
+# get_logger() starts the listener thread: fork worker processes (see
+# inference_worker.py) before the first call. A process forked later logs
+# directly to stdout instead of into the parent's queue.
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+
+QUEUE_SIZE = 10000
+
+_listener = None
+_output = None
+_level = logging.INFO
+
+
+class StructuredFormatter(logging.Formatter):
+    def __init__(self, as_json=False):
+        super().__init__("%(asctime)s.%(msecs)03d %(levelname)-7s %(name)s  %(message)s", "%H:%M:%S")
+        self.as_json = as_json
+
+    def format(self, record):
+        fields = getattr(record, "fields", None) or {}
+        if self.as_json:
+            entry = {"time": record.created, "level": record.levelname, "logger": record.name,
+                     "msg": record.getMessage(), **fields}
+            if record.exc_info:
+                entry["exc"] = self.formatException(record.exc_info)
+            return json.dumps(entry, ensure_ascii=False, default=str)
+        line = super().format(record)
+        if fields:
+            line += "  " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Never formats in the calling thread and never waits for the queue."""
+
+    def prepare(self, record):
+        return record  # The listener thread formats it
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass  # Terminal can't keep up: drop rather than block the caller
+
+
+class EventLogger:
+    """logging.Logger with structured fields: log.info("msg", command=..., error=...)."""
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.samples = {}     # key -> [time of last line, skipped count]
+
+    def log(self, level, msg, exc_info=None, **fields):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, msg, exc_info=exc_info, extra={"fields": fields})
+
+    def info(self, msg, **fields):
+        self.log(logging.INFO, msg, **fields)
+
+    def warning(self, msg, **fields):
+        self.log(logging.WARNING, msg, **fields)
+
+    def error(self, msg, **fields):
+        self.log(logging.ERROR, msg, **fields)
+
+    def sampled(self, key, interval, msg, level=logging.INFO, exc_info=None, **fields):
+        """At most one line per `interval` seconds for `key` (per-frame errors)."""
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        sample = self.samples.get(key)
+        if sample is not None and now - sample[0] < interval:
+            sample[1] += 1
+            return
+        skipped = sample[1] if sample is not None else 0
+        self.samples[key] = [now, 0]
+        if skipped:
+            fields["skipped"] = skipped
+        self.log(level, msg, exc_info=exc_info, **fields)
+
+
+def _after_fork_in_child():
+    # The child has a copy of the queue but no listener thread (and the copied
+    # queue lock may be held): write straight to the output instead
+    global _listener
+    root = logging.getLogger()
+    for handler in [h for h in root.handlers if isinstance(h, _QueueHandler)]:
+        root.removeHandler(handler)
+    root.addHandler(_output)
+    _listener = None
+
+
+def setup():
+    """Install the queue handler on the root logger and start the listener (once)."""
+    global _listener, _output, _level
+    if _output is not None:
+        return  # Already set up (a forked child keeps writing directly)
+    _level = os.environ.get("LOG_LEVEL", "INFO").upper()
+    _output = logging.StreamHandler(sys.stdout)
+    _output.setFormatter(StructuredFormatter(os.environ.get("LOG_FORMAT", "").lower() == "json"))
+    log_queue = queue.Queue(QUEUE_SIZE)
+
+    root = logging.getLogger()
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(logging.WARNING)
+    _listener = logging.handlers.QueueListener(log_queue, _output)
+    _listener.start()
+    atexit.register(shutdown)
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def shutdown():
+    """Flush what is still queued and stop the listener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name):
+    setup()
+    logger = logging.getLogger(name)
+    logger.setLevel(_level)
+    return EventLogger(logger)
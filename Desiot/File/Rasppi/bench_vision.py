@@ -0,0 +1,366 @@
+# ==========================================
+# VISION BENCHMARK (End-to-End, Reproducible)
+# ==========================================
+# Replays the same frame set through each detection pipeline and reports
+# per-stage latency percentiles, throughput, CPU utilization and peak RSS
+# as JSON. Compare against a saved report to catch regressions before
+# deploying to the robot.
+#
+# Frames are decoded/rendered into memory before timing and replayed
+# unpaced (any "@FPS" in --source is ignored), so a synthetic or recorded
+# source never caps the measured FPS. Every pipeline runs in its own
+# process: peak RSS and CPU time belong to that pipeline alone.
+#
+# Contoh:
+#   python bench_vision.py --source dir:recordings --frames 300
+#   python bench_vision.py --source synthetic --pipelines onnx,tflite --out bench.json
+#   python bench_vision.py --source dir:recordings --baseline bench.json
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from frame_source import ArraySource, open_source
+
+
+STAGES = ("capture", "convert", "preprocess", "inference", "postprocess", "encode", "uart")
+TARGET_CLASSES = (39, 41)  # Bottle / Cup (COCO)
+
+
+# =======================
+# STAGE TIMER
+# =======================
+class StageTimer:
+    """Collects raw per-stage samples (ms) so exact percentiles can be reported."""
+
+    def __init__(self):
+        self.samples = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000.0)
+
+    def add(self, name, ms):
+        self.samples.setdefault(name, []).append(ms)
+
+    def summary(self):
+        out = {}
+        for name in STAGES + tuple(n for n in self.samples if n not in STAGES):
+            values = self.samples.get(name)
+            if not values:
+                continue
+            arr = np.asarray(values)
+            p50, p90, p95, p99 = np.percentile(arr, [50, 90, 95, 99])
+            out[name] = {
+                "count": int(arr.size),
+                "mean_ms": round(float(arr.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p90_ms": round(float(p90), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(arr.max()), 3),
+            }
+        return out
+
+
+# =======================
+# PIPELINES
+# =======================
+# Each pipeline takes a BGR frame and returns the UART message bytes the
+# robot would send for it, timing its own preprocess/inference/postprocess.
+
+class OnnxClassifierPipeline:
+    """Garbage classifier from classify.py (best.onnx + classes.txt)."""
+
+    name = "onnx"
+
+    def __init__(self, model_path):
+        import classify
+        classify.load_model(model_path)
+        self.classify = classify
+
+    def run(self, frame_bgr, timer):
+        c = self.classify
+        with timer.stage("preprocess"):
+            tensor = c.preprocess(frame_bgr)
+        with timer.stage("inference"):
+            outputs = c.session.run([c.output_name], {c.input_name: tensor})
+        with timer.stage("postprocess"):
+            class_id = int(np.argmax(outputs[0][0]))
+        return f"{class_id}\n".encode("utf-8")
+
+
+class UltralyticsYoloPipeline:
+    """Same call the Pi servers make (imgsz=192, bottle/cup only)."""
+
+    name = "yolo"
+
+    def __init__(self, model_path, imgsz=192, conf=0.4):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.imgsz = imgsz
+        self.conf = conf
+
+    def run(self, frame_bgr, timer):
+        results = self.model(frame_bgr, imgsz=self.imgsz, verbose=False, conf=self.conf)
+        r = results[0]
+        # Ultralytics times its own stages; reuse them instead of guessing
+        timer.add("preprocess", r.speed["preprocess"])
+        timer.add("inference", r.speed["inference"])
+        with timer.stage("postprocess"):
+            boxes = r.boxes
+            cls = boxes.cls.cpu().numpy().astype(int)
+            xyxy = boxes.xyxy.cpu().numpy()
+            hits = np.flatnonzero(np.isin(cls, TARGET_CLASSES))
+            msg = _servo_message(xyxy[hits[0]] if hits.size else None, frame_bgr.shape)
+        timer.samples["postprocess"][-1] += r.speed["postprocess"]
+        return msg
+
+
+class TfliteYoloPipeline:
+    """yolov8n_int8.tflite exported by Ultralytics, decoded here with NumPy + NMS."""
+
+    name = "tflite"
+
+    def __init__(self, model_path, conf=0.4, iou=0.5, threads=4):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite.python.interpreter import Interpreter
+        self.interpreter = Interpreter(model_path=model_path, num_threads=threads)
+        self.interpreter.allocate_tensors()
+        self.inp = self.interpreter.get_input_details()[0]
+        self.out = self.interpreter.get_output_details()[0]
+        _, self.in_h, self.in_w, _ = self.inp["shape"]
+        self.conf = conf
+        self.iou = iou
+
+    def run(self, frame_bgr, timer):
+        with timer.stage("preprocess"):
+            img = cv2.resize(frame_bgr, (int(self.in_w), int(self.in_h)))
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+            scale, zero = self.inp["quantization"]
+            if self.inp["dtype"] != np.float32 and scale:
+                img = np.round(img / scale + zero).astype(self.inp["dtype"])
+            tensor = img[None]
+
+        with timer.stage("inference"):
+            self.interpreter.set_tensor(self.inp["index"], tensor)
+            self.interpreter.invoke()
+            raw = self.interpreter.get_tensor(self.out["index"])[0]
+
+        with timer.stage("postprocess"):
+            scale, zero = self.out["quantization"]
+            pred = (raw.astype(np.float32) - zero) * scale if scale else raw.astype(np.float32)
+            if pred.shape[0] < pred.shape[1]:
+                pred = pred.T  # (84, N) -> (N, 84)
+            box = self._best_target(pred, frame_bgr.shape)
+            msg = _servo_message(box, frame_bgr.shape)
+        return msg
+
+    def _best_target(self, pred, shape):
+        scores = pred[:, 4:]
+        cls = scores.argmax(axis=1)
+        conf = scores[np.arange(len(scores)), cls]
+        keep = (conf >= self.conf) & np.isin(cls, TARGET_CLASSES)
+        if not keep.any():
+            return None
+        xywh = pred[keep, :4]
+        if xywh.max() <= 2.0:
+            xywh = xywh * [self.in_w, self.in_h, self.in_w, self.in_h]  # Normalized export
+        rows, cols = shape[:2]
+        xywh = xywh * [cols / self.in_w, rows / self.in_h, cols / self.in_w, rows / self.in_h]
+        tl = xywh[:, :2] - xywh[:, 2:] / 2
+        idx = cv2.dnn.NMSBoxes(np.hstack([tl, xywh[:, 2:]]).tolist(), conf[keep].tolist(), self.conf, self.iou)
+        if len(idx) == 0:
+            return None
+        x, y = tl[int(np.ravel(idx)[0])]
+        w, h = xywh[int(np.ravel(idx)[0]), 2:]
+        return (x, y, x + w, y + h)
+
+
+def _servo_message(box, shape):
+    """Same "x,y,beep" format the trackers send; fixed 90,90 when nothing is found."""
+    if box is None:
+        return b"90,90,0\n"
+    rows, cols = shape[:2]
+    x1, y1, x2, y2 = box
+    pan = int(90 + (cols / 2 - (x1 + x2) / 2) * 90 / cols)
+    tilt = int(90 + ((y1 + y2) / 2 - rows / 2) * 30 / rows)
+    return f"{pan},{tilt},1\n".encode("utf-8")
+
+
+PIPELINES = {
+    "onnx": (OnnxClassifierPipeline, "best.onnx"),
+    "yolo": (UltralyticsYoloPipeline, "yolov8n.pt"),
+    "tflite": (TfliteYoloPipeline, "yolov8n_int8.tflite"),
+}
+
+
+# =======================
+# RUNNER
+# =======================
+def _cpu_seconds():
+    t = os.times()
+    return t.user + t.system
+
+
+def preload_frames(source_spec, count):
+    """Capture `count` frames up front and return an unpaced, looping replay source."""
+    source = open_source(source_spec.split("@", 1)[0])
+    try:
+        source.fps = None  # No pacing (synthetic time still steps at its nominal 30 FPS)
+        # Copy: synthetic/video sources reuse their buffers
+        frames = [np.array(source.capture_array()) for _ in range(count)]
+    finally:
+        source.stop()
+    return ArraySource(frames)
+
+
+def run_pipeline(pipeline, source, frames, warmup, uart):
+    try:
+        for _ in range(warmup):
+            pipeline.run(cv2.cvtColor(source.capture_array(), cv2.COLOR_RGB2BGR), StageTimer())
+
+        timer = StageTimer()
+        wall_start, cpu_start = time.perf_counter(), _cpu_seconds()
+        for _ in range(frames):
+            frame_start = time.perf_counter()
+            with timer.stage("capture"):
+                frame_rgb = source.capture_array()
+            with timer.stage("convert"):
+                frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
+            msg = pipeline.run(frame_bgr, timer)
+            with timer.stage("encode"):
+                cv2.imencode(".jpg", frame_bgr)
+            with timer.stage("uart"):
+                uart.write(msg)
+            timer.add("total", (time.perf_counter() - frame_start) * 1000.0)
+        wall = time.perf_counter() - wall_start
+        cpu = _cpu_seconds() - cpu_start
+    finally:
+        source.stop()
+
+    return {
+        "frames": frames,
+        "wall_s": round(wall, 3),
+        "throughput_fps": round(frames / wall, 2),
+        "cpu_utilization": round(cpu / wall, 3),  # 1.0 = one core fully busy
+        # Own process per pipeline (see bench_one), so this is not inherited from earlier runs
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+        "stages": timer.summary(),
+    }
+
+
+def bench_one(name, model_path, source_spec, frames, warmup, preload, uart_port):
+    """Benchmark one pipeline; meant to run in a fresh process."""
+    cv2.setNumThreads(1)  # Keep runs comparable between machines/runs
+    cls = PIPELINES[name][0]
+    try:
+        pipeline = cls(model_path)
+    except Exception as e:
+        return {"error": str(e)}
+
+    source = preload_frames(source_spec, max(1, min(frames, preload)))
+    if uart_port:
+        import serial
+        uart = serial.Serial(uart_port, baudrate=115200, timeout=0.1)
+    else:
+        uart = open(os.devnull, "wb", buffering=0)
+    try:
+        return run_pipeline(pipeline, source, frames, warmup, uart)
+    finally:
+        uart.close()
+
+
+def compare(report, baseline, tolerance):
+    """Return regressions where p50 of a stage grew by more than `tolerance`."""
+    regressions = []
+    for name, result in report["pipelines"].items():
+        base = baseline.get("pipelines", {}).get(name)
+        if not base or "stages" not in result or "stages" not in base:
+            continue
+        for stage, stats in result["stages"].items():
+            old = base["stages"].get(stage, {}).get("p50_ms")
+            if old and stats["p50_ms"] > old * (1 + tolerance) and stats["p50_ms"] - old > 0.5:
+                regressions.append(f"{name}.{stage}: p50 {old:.2f} -> {stats['p50_ms']:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay frames through the vision pipelines")
+    parser.add_argument("--source", default="synthetic", help="FRAME_SOURCE spec, see frame_source.py")
+    parser.add_argument("--pipelines", default="onnx,yolo,tflite")
+    parser.add_argument("--model", action="append", default=[], metavar="NAME=PATH",
+                        help="Override a model path, e.g. yolo=yolov8n.pt")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--preload", type=int, default=60,
+                        help="Distinct frames held in memory and replayed in a loop")
+    parser.add_argument("--uart", default=None, help="Serial port to write to (default: /dev/null)")
+    parser.add_argument("--out", default="bench_report.json")
+    parser.add_argument("--baseline", default=None, help="Previous report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed p50 growth (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    overrides = dict(m.split("=", 1) for m in args.model)
+
+    report = {
+        "source": args.source,
+        "frames": args.frames,
+        "warmup": args.warmup,
+        "preload": args.preload,
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+        },
+        "pipelines": {},
+    }
+
+    # "spawn": a clean interpreter per pipeline, nothing inherited from the previous one
+    context = multiprocessing.get_context("spawn")
+    for name in args.pipelines.split(","):
+        print(f"⏱️ Benchmarking {name}...")
+        model_path = overrides.get(name, PIPELINES[name][1])
+        with context.Pool(1) as pool:
+            result = pool.apply(bench_one, (name, model_path, args.source, args.frames,
+                                            args.warmup, args.preload, args.uart))
+        report["pipelines"][name] = result
+        if "error" in result:
+            print(f"⚠️ Skipping {name}: {result['error']}")
+            continue
+        total = result["stages"]["total"]
+        print(f"   {result['throughput_fps']} FPS, p50 {total['p50_ms']} ms, "
+              f"p99 {total['p99_ms']} ms, peak RSS {result['peak_rss_mb']} MB")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Report saved: {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"❌ Regression {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
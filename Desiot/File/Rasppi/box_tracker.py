@@ -0,0 +1,71 @@
+# ==========================================
+# BOX TRACKER (Kalman Filter Between Detections)
+# ==========================================
+# YOLO only runs on some frames. In between, the box is predicted with a
+# constant-velocity Kalman filter on (cx, cy, w, h) so the servo follows
+# where the target is now, not where it was at the last detection.
+#
+# The kf_* functions work on stacked state arrays (N targets at once);
+# MultiObjectTracker (multi_tracker.py) keeps the per-track state.
+
+import numpy as np
+
+
+# State: [cx, cy, w, h, vx, vy, vw, vh]
+STATE_DIM = 8
+MEAS_DIM = 4
+_H = np.hstack([np.eye(MEAS_DIM), np.zeros((MEAS_DIM, MEAS_DIM))])
+
+
+def box_to_z(boxes):
+    """(N, 4) x1,y1,x2,y2 -> (N, 4) cx,cy,w,h"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    wh = boxes[:, 2:] - boxes[:, :2]
+    return np.hstack([boxes[:, :2] + wh / 2, wh])
+
+
+def z_to_box(z):
+    """(N, >=4) cx,cy,w,h,... -> (N, 4) x1,y1,x2,y2"""
+    z = np.asarray(z, dtype=np.float64).reshape(-1, z.shape[-1])
+    half = np.maximum(z[:, 2:4], 1.0) / 2
+    return np.hstack([z[:, :2] - half, z[:, :2] + half])
+
+
+def kf_init(z, pos_var=10.0, vel_var=1000.0):
+    """New states from (N, 4) measurements: zero velocity, large velocity uncertainty."""
+    n = len(z)
+    x = np.zeros((n, STATE_DIM))
+    x[:, :MEAS_DIM] = z
+    P = np.tile(np.diag([pos_var] * MEAS_DIM + [vel_var] * MEAS_DIM), (n, 1, 1))
+    return x, P
+
+
+def kf_predict(x, P, dt, accel_var=500.0):
+    """Advance all states by dt seconds (dt scalar or (N,))."""
+    dt = np.broadcast_to(np.asarray(dt, dtype=np.float64), (len(x),))
+    F = np.tile(np.eye(STATE_DIM), (len(x), 1, 1))
+    idx = np.arange(MEAS_DIM)
+    F[:, idx, idx + MEAS_DIM] = dt[:, None]
+
+    # White-acceleration process noise
+    q = accel_var * np.stack([dt ** 4 / 4, dt ** 3 / 2, dt ** 2], axis=1)  # (N, 3)
+    Q = np.zeros_like(P)
+    Q[:, idx, idx] = q[:, 0:1]
+    Q[:, idx, idx + MEAS_DIM] = q[:, 1:2]
+    Q[:, idx + MEAS_DIM, idx] = q[:, 1:2]
+    Q[:, idx + MEAS_DIM, idx + MEAS_DIM] = q[:, 2:3]
+
+    x = np.einsum("nij,nj->ni", F, x)
+    P = F @ P @ F.transpose(0, 2, 1) + Q
+    return x, P
+
+
+def kf_update(x, P, z, meas_var=25.0):
+    """Correct states with (N, 4) measurements (same order as x)."""
+    S = P[:, :MEAS_DIM, :MEAS_DIM] + meas_var * np.eye(MEAS_DIM)
+    K = P[:, :, :MEAS_DIM] @ np.linalg.inv(S)           # (N, 8, 4)
+    y = z - x[:, :MEAS_DIM]
+    x = x + np.einsum("nij,nj->ni", K, y)
+    P = (np.eye(STATE_DIM) - K @ _H) @ P
+    return x, P
+
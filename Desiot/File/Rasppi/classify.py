@@ -1,10 +1,12 @@
-from picamera2 import Picamera2
 import cv2
 import numpy as np
 import onnxruntime as ort
 import time
 import serial  # <--- UART
 
+from frame_source import open_source
+from decision_filter import DecisionFilter
+
 # =======================
 # KONFIGURASI MODEL
 # =======================
@@ -12,6 +14,16 @@ MODEL_PATH = "best.onnx"
 CLASSES_FILE = "classes.txt"
 INPUT_SIZE = 224  # YOLOv8 classification biasanya 224x224
 
+# =======================
+# KONFIGURASI KEPUTUSAN
+# =======================
+# Prediksi per frame dihaluskan dulu (lihat decision_filter.py),
+# UART hanya dikirim kalau keputusan berubah.
+SMOOTHING_MODE = "mean"   # mean / vote / ema
+SMOOTHING_WINDOW = 8      # Jumlah frame terakhir
+ENTER_CONFIDENCE = 0.6    # Skor minimal untuk jadi keputusan baru
+EXIT_CONFIDENCE = 0.4     # Keputusan lama dilepas kalau skornya di bawah ini
+
 # =======================
 # KONFIGURASI UART
 # =======================
@@ -22,24 +34,36 @@ BAUDRATE = 115200
 # =======================
 # LOAD KELAS & MODEL
 # =======================
-with open(CLASSES_FILE, "r") as f:
-    classes = [line.strip() for line in f.readlines()]
+# Dimuat lewat load_model() supaya modul ini bisa di-import
+# (misalnya oleh bench_vision.py) tanpa langsung membuka model.
+classes = []
+session = None
+input_name = None
+output_name = None
+
 
-print(f"Loaded {len(classes)} classes: {classes}")
+def load_model(model_path=MODEL_PATH, classes_file=CLASSES_FILE):
+    global classes, session, input_name, output_name
 
-so = ort.SessionOptions()
-so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-session = ort.InferenceSession(
-    MODEL_PATH,
-    sess_options=so,
-    providers=["CPUExecutionProvider"],
-)
+    with open(classes_file, "r") as f:
+        classes = [line.strip() for line in f.readlines()]
 
-input_name = session.get_inputs()[0].name
-output_name = session.get_outputs()[0].name
+    print(f"Loaded {len(classes)} classes: {classes}")
 
-print("Model loaded successfully!")
-print(f"Expected input shape: {session.get_inputs()[0].shape}")
+    so = ort.SessionOptions()
+    so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(
+        model_path,
+        sess_options=so,
+        providers=["CPUExecutionProvider"],
+    )
+
+    input_name = session.get_inputs()[0].name
+    output_name = session.get_outputs()[0].name
+
+    print("Model loaded successfully!")
+    print(f"Expected input shape: {session.get_inputs()[0].shape}")
+    return session
 
 
 # =======================
@@ -85,6 +109,30 @@ def classify(image_bgr):
     return class_id, confidence, predictions
 
 
+def preprocess_batch(images_bgr):
+    """
+    Beberapa image BGR (misalnya crop per objek) -> numpy array [N, 3, 224, 224]
+    """
+    batch = np.empty((len(images_bgr), 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+    for i, image_bgr in enumerate(images_bgr):
+        batch[i] = preprocess(image_bgr)[0]
+    return batch
+
+
+def classify_batch(images_bgr):
+    """
+    Klasifikasi banyak image sekaligus dalam satu session.run().
+    Return: probabilities [N, num_classes]
+    """
+    if len(images_bgr) == 0:
+        return np.zeros((0, len(classes)), dtype=np.float32)
+    batch = preprocess_batch(images_bgr)
+    if session.get_inputs()[0].shape[0] == 1:
+        # Model di-export dengan batch statis = 1: jalankan satu per satu
+        return np.concatenate([session.run([output_name], {input_name: b[None]})[0] for b in batch])
+    return session.run([output_name], {input_name: batch})[0]
+
+
 # =======================
 # FUNGSI UI
 # =======================
@@ -199,13 +247,10 @@ def draw_result_ui(frame_bgr, class_name, confidence, all_probs, fps):
 # MAIN LOOP
 # =======================
 def main():
-    # Inisialisasi kamera (Picamera2)
-    picam2 = Picamera2()
-    preview_config = picam2.create_preview_configuration(
-        main={"size": (640, 480), "format": "RGB888"}
-    )
-    picam2.configure(preview_config)
-    picam2.start()
+    load_model()
+
+    # Inisialisasi kamera (Picamera2, atau FRAME_SOURCE lain - lihat frame_source.py)
+    camera = open_source(size=(640, 480))
     time.sleep(1)  # waktu buat auto-exposure
 
     # Inisialisasi UART
@@ -234,25 +279,37 @@ def main():
     last_class_name = "..."
     last_confidence = 0.0
     last_probs = np.zeros(len(classes), dtype=np.float32)
+    decision = DecisionFilter(
+        len(classes),
+        window=SMOOTHING_WINDOW,
+        mode=SMOOTHING_MODE,
+        enter=ENTER_CONFIDENCE,
+        exit=EXIT_CONFIDENCE,
+    )
 
     try:
         while True:
             # Ambil frame dari kamera (RGB) -> BGR
-            frame_rgb = picam2.capture_array()
+            frame_rgb = camera.capture_array()
             frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
 
-            # Jalankan klasifikasi
+            # Jalankan klasifikasi, lalu haluskan (smoothing + hysteresis)
             class_id, confidence, all_probs = classify(frame_bgr)
-            last_class_name = classes[class_id]
-            last_confidence = confidence
-            last_probs = all_probs
+            stable_id, stable_conf, changed = decision.update(all_probs)
+            if stable_id is not None:
+                last_class_name = classes[stable_id]
+                last_confidence = stable_conf
+            last_probs = decision.scores
 
             # === Kirim hasil via UART ===
             # Format sederhana: hanya ID kelas + newline, misal "3\n"
-            try:
-                ser.write(f"{class_id}\n".encode("utf-8"))
-            except Exception as e:
-                print("UART write error:", e)
+            # Hanya saat keputusan berubah, bukan setiap frame
+            if changed:
+                try:
+                    ser.write(f"{stable_id}\n".encode("utf-8"))
+                    print(f"UART -> {stable_id} ({last_class_name})")
+                except Exception as e:
+                    print("UART write error:", e)
 
             # Hitung FPS tampilan
             fps_counter += 1
@@ -282,7 +339,7 @@ def main():
                 print(f"Screenshot saved: {filename}")
 
     finally:
-        picam2.stop()
+        camera.stop()
         ser.close()
         cv2.destroyAllWindows()
         print("Program selesai!")
@@ -0,0 +1,85 @@
+# ==========================================
+# DECISION FILTER (Smoothing + Hysteresis)
+# ==========================================
+# classify.py produces a probability vector per frame; its argmax flickers
+# between classes on borderline frames. DecisionFilter turns that stream
+# into a stable decision:
+#   1. Smoothing over the last `window` frames, kept in a fixed-size NumPy
+#      ring buffer (no per-frame allocation):
+#        "mean": average probabilities   "vote": share of argmax votes
+#      or "ema": exponential moving average (alpha) without a window.
+#   2. Hysteresis: after `min_samples` frames, a class becomes the decision
+#      once its smoothed score reaches `enter`; the decision only moves to
+#      another class when that class reaches `enter` AND the current one
+#      has fallen below `exit`.
+# update() reports whether the decision changed, so UART only carries
+# actual changes.
+
+import numpy as np
+
+
+MODES = ("mean", "vote", "ema")
+
+
+class DecisionFilter:
+    def __init__(self, num_classes, window=8, mode="mean", alpha=0.3, enter=0.6, exit=0.4,
+                 min_samples=3):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        self.num_classes = num_classes
+        self.window = window
+        self.mode = mode
+        self.alpha = alpha
+        self.enter = enter
+        self.exit = exit
+        self.min_samples = min_samples
+        self.reset()
+
+    def reset(self):
+        self.buffer = np.zeros((self.window, self.num_classes), dtype=np.float32)
+        self.total = np.zeros(self.num_classes, dtype=np.float64)  # Running sum of the buffer
+        self.index = 0
+        self.count = 0
+        self.scores = np.zeros(self.num_classes, dtype=np.float64)
+        self.decision = None
+        self.changes = 0
+        self.samples = 0
+
+    def _smooth(self, probs):
+        if self.mode == "ema":
+            if self.count == 0:
+                self.scores[:] = probs
+            else:
+                self.scores += self.alpha * (probs - self.scores)
+            self.count += 1
+            return self.scores
+
+        if self.mode == "vote":
+            sample = np.zeros(self.num_classes, dtype=np.float32)
+            sample[int(np.argmax(probs))] = 1.0
+        else:
+            sample = probs
+        # Replace the oldest row and keep the running sum in step
+        self.total += sample - self.buffer[self.index]
+        self.buffer[self.index] = sample
+        self.index = (self.index + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+        self.scores[:] = self.total / self.count
+        return self.scores
+
+    def update(self, probs):
+        """Feed one probability vector. Returns (decision, score, changed)."""
+        scores = self._smooth(np.asarray(probs, dtype=np.float32))
+        best = int(np.argmax(scores))
+        previous = self.decision
+        self.samples += 1
+
+        if self.samples >= self.min_samples and scores[best] >= self.enter:
+            if self.decision is None or scores[self.decision] < self.exit:
+                self.decision = best
+
+        changed = self.decision != previous
+        if changed:
+            self.changes += 1
+        score = float(scores[self.decision]) if self.decision is not None else 0.0
+        return self.decision, score, changed
@@ -18,8 +18,7 @@ os.system("pkill -9 -f libcamera")
 
 
 from flask import Flask, render_template_string, request, jsonify, Response
-from picamera2 import Picamera2
-from ultralytics import YOLO
+from frame_source import open_source
 import cv2
 import serial
 import numpy as np
@@ -28,6 +27,18 @@ import speech_recognition as sr
 from gtts import gTTS
 import pygame
 import json
+import logging
+from stream_hub import StreamHub
+from metrics import metrics
+from async_log import get_logger
+from frame_mailbox import FrameMailbox
+from scheduler import AdaptiveScheduler
+from multi_tracker import MultiObjectTracker
+from inference_worker import InferenceWorker
+from frame_ring import FrameRing
+from roi import RoiPlanner
+from motion_gate import MotionGate
+from servo_controller import PanTiltController, AxisPID
 
 
 # =======================
@@ -39,41 +50,58 @@ BAUDRATE = 115200
 
 # --- OPTIMIZATION ---
 HEADLESS_MODE = False     
-SKIP_FRAMES = 3           # [FIX] Set to 3 to prevent freezing on Pi CPU
+DETECT_CPU_BUDGET = 0.5   # Share of one core YOLO may use (replaces SKIP_FRAMES)
+FRAME_BUDGET = 0.15       # Seconds per frame before detection backs off
 CONF_THRESHOLD = 0.4     
 MODEL_FILE = 'yolov8n.pt' # Standard Model for Accuracy
+MAX_FRAME_AGE = 0.25      # Seconds; older frames never drive the servos
+MAX_TRACKS = 8            # Bottles/cups tracked at once
+TARGET_POLICY = "lock"    # lock (stay on current target) / largest / center
+ROI_PAD = 1.0             # Crop around a locked target, in box sizes per side
+FULL_FRAME_INTERVAL = 1.0 # Seconds between full-frame re-acquisition runs
+ROI_IMGSZ = 160           # Crops are small and square, so a smaller input suffices
+MOTION_SENSITIVITY = 0.01 # Share of the thumbnail that must change to wake YOLO when not locked
+MOTION_REFRESH = 3.0      # Seconds; YOLO still runs this often on a static scene
+RING_SLOTS = 8            # Shared-memory frames kept (8 @ 30fps = ~230ms for readers)
 
 
 # =======================
 # HARDWARE SETUP
 # =======================
-print(f"🚀 Loading Standard YOLO Model ({MODEL_FILE})...")
-try:
-   model = YOLO(MODEL_FILE)
-except Exception as e:
-   print(f"❌ Model Error: {e}")
-   model = None
+# Captured frames live in shared memory; every consumer reads them in place
+frame_ring = FrameRing(shape=(480, 640, 3), slots=RING_SLOTS)
+metrics.register_collector(frame_ring.stats)
+
+
+# YOLO runs in its own process (forked here, before any thread, the camera or the log thread starts)
+model_worker = InferenceWorker(MODEL_FILE, frame_ring, conf=CONF_THRESHOLD)
+
+
+log = get_logger("demo2")   # Starts the log thread, so only after the fork. LOG_LEVEL=DEBUG/INFO/WARNING, LOG_FORMAT=json
+log.info("🚀 Loading Standard YOLO Model in worker process", model=MODEL_FILE)
+if not model_worker.wait_ready():
+   log.error("❌ Model Error", error=model_worker.error)
+metrics.register_collector(model_worker.stats)
 
 
 try:
    ser = serial.Serial(SERIAL_PORT, baudrate=BAUDRATE, timeout=1)
    ser.flush()
-   print(f"✅ Connected to ESP32 on {SERIAL_PORT}")
+   log.info("✅ Connected to ESP32", port=SERIAL_PORT, baudrate=BAUDRATE)
 except:
-   print("⚠️ WARNING: ESP32 NOT CONNECTED (Simulation Mode)")
+   log.warning("⚠️ ESP32 NOT CONNECTED (Simulation Mode)")
    ser = None
 
 
 try:
-   picam2 = Picamera2()
    # [FIX] Lower resolution slightly to ensure stability at 30fps
-   config = picam2.create_preview_configuration(main={"size": (640, 480), "format": "RGB888"})
-   picam2.configure(config)
-   picam2.start()
-   print("✅ Camera Started")
+   # Set FRAME_SOURCE (see frame_source.py) to run without the Pi camera
+   camera = open_source(size=(640, 480))
+   log.info("✅ Camera Started")
 except Exception as e:
-   print(f"❌ Camera Error: {e}")
-   print("TIP: Check ribbon cable or run 'sudo libcamera-hello' to test hardware.")
+   log.error("❌ Camera Error", error=str(e),
+             tip="Check ribbon cable or run 'sudo libcamera-hello' to test hardware.")
+   camera = None
 
 
 app = Flask(__name__)
@@ -83,13 +111,21 @@ app = Flask(__name__)
 # GLOBAL VARIABLES
 # =======================
 curr_x, curr_y = 90, 90
-step, margin = 3, 50
+servo = PanTiltController(tilt=AxisPID(sign=1.0, min_angle=85, max_angle=95))
 timeout_sec = 5.0        
 is_speaking = False
 is_processing_command = False
 frame_count = 0
-global_frame_jpg = None
-frame_lock = threading.Lock()
+stream_hub = StreamHub()  # Encodes JPEG only when /video_feed has viewers
+metrics.register_collector(lambda: {f"stream_{k}": v for k, v in stream_hub.stats().items()})
+frame_mailbox = FrameMailbox(max_age=MAX_FRAME_AGE)  # Capture -> vision, latest frame wins
+metrics.register_collector(frame_mailbox.stats)
+scheduler = AdaptiveScheduler(cpu_budget=DETECT_CPU_BUDGET, frame_budget=FRAME_BUDGET, inline=False)  # YOLO runs in the worker
+metrics.register_collector(scheduler.stats)
+roi_planner = RoiPlanner(pad=ROI_PAD, full_frame_interval=FULL_FRAME_INTERVAL)  # Locked target -> crop only
+metrics.register_collector(roi_planner.stats)
+motion_gate = MotionGate(min_changed=MOTION_SENSITIVITY, refresh_interval=MOTION_REFRESH)  # Static scene -> no YOLO
+metrics.register_collector(motion_gate.stats)
 
 
 # Manual Override Flag
@@ -111,9 +147,10 @@ serial_lock = threading.Lock()
 system_status = "READY"
 
 
-# Last Known Box
+# Tracked Boxes (predicted every frame, corrected whenever YOLO runs)
 last_box = None
-last_box_time = 0
+locked_id = None
+object_tracker = MultiObjectTracker(max_tracks=MAX_TRACKS, max_age=0.5)
 
 
 # =======================
@@ -124,19 +161,28 @@ def robot_speak(text):
    def _speak():
        global is_speaking
        is_speaking = True
-       print(f"🤖 Robot: {text}")
+       log.info("🤖 Robot", text=text)
        try:
-           tts = gTTS(text=text, lang='id')
-           tts.save("/tmp/response.mp3")
-           pygame.mixer.init()
-           pygame.mixer.music.load("/tmp/response.mp3")
-           pygame.mixer.music.play()
-           while pygame.mixer.music.get_busy(): continue
-       except: pass
+           with metrics.span("tts"):
+               tts = gTTS(text=text, lang='id')
+               tts.save("/tmp/response.mp3")
+               pygame.mixer.init()
+               pygame.mixer.music.load("/tmp/response.mp3")
+               pygame.mixer.music.play()
+               while pygame.mixer.music.get_busy(): continue
+       except: metrics.inc("tts_errors")
        is_speaking = False
    threading.Thread(target=_speak).start()
 
 
+def uart_write(data):
+   """Timed write of raw bytes to the ESP32 (no-op in Simulation Mode)"""
+   if not ser: return
+   with serial_lock, metrics.span("uart"):
+       ser.write(data)
+   metrics.inc("uart_messages")
+
+
 def send_uart_command(action, duration=0):
    """Sends command to ESP32 safely using the Lock"""
    global is_manual_override, override_timer, system_status, is_auto_mode, search_phase, search_start_time
@@ -163,20 +209,19 @@ def send_uart_command(action, duration=0):
 
    if ser:
        try:
-           with serial_lock:
-               command_str = f"{action}\n"
-               ser.write(command_str.encode('utf-8'))
-               print(f"⚡ Sent to ESP32: {command_str.strip()}")
+           command_str = f"{action}\n"
+           uart_write(command_str.encode('utf-8'))
+           log.info("⚡ Sent to ESP32", command=action, duration=duration)
           
            if duration > 0:
                def delayed_stop():
                    time.sleep(duration)
-                   with serial_lock:
-                       ser.write(b'S\n')
-                       print("⚡ Auto-Stop Sent")
+                   uart_write(b'S\n')
+                   log.info("⚡ Auto-Stop Sent", after=duration)
                threading.Thread(target=delayed_stop).start()
        except Exception as e:
-           print(f"❌ Serial Error: {e}")
+           metrics.inc("uart_errors")
+           log.error("❌ Serial Error", command=action, error=str(e))
 
 
 # =======================
@@ -261,9 +306,10 @@ def manual_cmd():
 @app.route('/process_voice', methods=['POST'])
 def web_voice_input():
    global system_status
+   start = time.monotonic()
    data = request.json
    text = data.get('text', '').lower()
-   print(f"🗣️ Voice: {text}")
+   log.info("🗣️ Voice", text=text)
   
    system_status = f"VOICE: {text[:15]}..."
   
@@ -288,45 +334,81 @@ def web_voice_input():
    else:
        robot_speak("Tidak kenal.")
       
+   metrics.observe("voice", time.monotonic() - start)
    return jsonify({"status": "processed"})
 
 
 @app.route('/video_feed')
 def video_feed():
    def generate():
-       while True:
-           with frame_lock:
-               if global_frame_jpg is None: continue
-               data = global_frame_jpg
-           yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + data + b'\r\n')
-           time.sleep(0.05)
+       with stream_hub.subscribe():
+           seq = 0
+           while True:
+               seq, data = stream_hub.wait_jpeg(seq)
+               if data is None: continue
+               yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + data + b'\r\n')
+               time.sleep(0.05)
    return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 
+@app.route('/stream_stats')
+def stream_stats():
+   return jsonify(stream_hub.stats())
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+   return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+# =======================
+# CAPTURE THREAD
+# =======================
+def capture_loop():
+   """Grabs frames as fast as the camera delivers them; the newest one wins"""
+   log.info("📷 Capture Thread Started")
+   while True:
+       # [ERROR CHECK] If camera times out, we catch and retry
+       try:
+           # Capture straight into the next shared-memory slot
+           seq, slot = frame_ring.claim()
+           with metrics.span("capture"):
+               frame_rgb = camera.capture_into(slot)
+       except Exception as e:
+           metrics.inc("capture_errors")
+           log.sampled("cam_io", 5.0, "⚠️ Cam IO Error", logging.WARNING, error=str(e))
+           time.sleep(0.5)
+           continue
+       timestamp = time.monotonic()
+       frame_ring.commit(seq, timestamp)
+       frame_mailbox.put(frame_rgb, timestamp, seq=seq)
+
+
 # =======================
 # VISION THREAD
 # =======================
 def ai_logic_loop():
-   global curr_x, curr_y, global_frame_jpg, frame_count, is_manual_override, system_status, last_box, last_box_time, is_auto_mode, search_phase, search_start_time
-   print("🧠 AI Vision Thread Started...")
+   global curr_x, curr_y, frame_count, is_manual_override, system_status, last_box, locked_id, is_auto_mode, search_phase, search_start_time
+   log.info("🧠 AI Vision Thread Started")
    last_seen_time = time.time()
   
    # Sweep variables
    sweep_angle = 90
    sweep_dir = 1
+   beep_trigger = 0
   
    while True:
        try:
-           # [ERROR CHECK] If camera times out, we catch and retry
-           try:
-               frame_rgb = picam2.capture_array()
-           except Exception as e:
-               print(f"⚠️ Cam IO Error: {e}")
-               time.sleep(0.5)
-               continue
+           frame = frame_mailbox.get(timeout=1.0)
+           if frame is None: continue
+           loop_start = time.monotonic()
 
 
-           frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
+           with metrics.span("convert"):
+               frame_bgr = cv2.cvtColor(frame.image, cv2.COLOR_RGB2BGR)
+           if not frame_ring.valid(frame.seq):
+               frame_mailbox.mark_stale(frame)  # Capture lapped the ring while we converted
+               continue
            rows, cols, _ = frame_bgr.shape
            center_x = cols // 2
            center_y = rows // 2
@@ -336,28 +418,40 @@ def ai_logic_loop():
            # --- DETECTION LOGIC ---
            if not is_manual_override:
               
-               # [OPTIMIZATION] Run heavy AI every N frames
-               if model and (frame_count % (SKIP_FRAMES + 1) == 0):
-                   results = model(frame_bgr, imgsz=192, stream=True, verbose=False, conf=CONF_THRESHOLD)
-                   found_target = False
+               # Tracker predicts every box on every frame; tracks die after 0.5s of missed detections
+               object_tracker.predict(frame.timestamp)
+               locked_id, last_box = object_tracker.select_target(TARGET_POLICY, frame_bgr.shape, locked_id)
+
+               # [OPTIMIZATION] Run heavy AI when the adaptive scheduler asks for it
+               vision_state = "LOCKED" if last_box else ("SEARCH" if is_auto_mode else "IDLE")
+               # Not locked: skip frames that look the same as the last one YOLO saw
+               scene_changed = vision_state == "LOCKED" or motion_gate.changed(frame_bgr, frame.timestamp)
+               if not (model_worker.can_submit and scene_changed):
+                   scheduler.skip(frame.timestamp, vision_state, reason="static" if model_worker.can_submit else "busy")
+               elif scheduler.should_run(frame.timestamp, vision_state, object_tracker.speed(locked_id)):
+                   motion_gate.accept(frame.timestamp)
+                   # Locked: detect on a padded crop around the target (smaller input, more pixels on the bottle)
+                   region = roi_planner.plan(frame_bgr.shape, last_box, frame.timestamp)
+                   imgsz = 192 if roi_planner.full else ROI_IMGSZ
+                   model_worker.submit(frame.seq, frame.timestamp, region, imgsz)
+                   metrics.inc("detections_run")
+
+
+               # Detections arrive from the worker process; tracking and streaming never wait for them
+               result = model_worker.poll()
+               if result:
+                   scheduler.record_inference(result.seconds, result.timestamp)  # The submitted frame, not the current one
+                   metrics.observe("inference", result.seconds)
                    beep_trigger = 0
 
 
-                   for r in results:
-                       boxes = r.boxes
-                       for box in boxes:
-                           if int(box.cls[0]) in [39, 41]: # Bottle/Cup
-                               found_target = True
-                               last_seen_time = time.time()
-                               x1, y1, x2, y2 = box.xyxy[0]
-                               last_box = (int(x1), int(y1), int(x2), int(y2))
-                               last_box_time = time.time()
-                               if float(box.conf[0]) > 0.7: beep_trigger = 1
-                               break
-                       if found_target: break
-                  
-                   if not found_target and time.time() - last_box_time > 0.5:
-                       last_box = None
+                   with metrics.span("postprocess"):
+                       # Every bottle/cup keeps its own ID; stay on the locked one instead of the first listed
+                       object_tracker.update(roi_planner.to_frame(result.detections, result.region), result.timestamp, result.region, frame_bgr.shape)
+                       locked_id, last_box = object_tracker.select_target(TARGET_POLICY, frame_bgr.shape, locked_id)
+                       if last_box:
+                           last_seen_time = time.time()
+                           if object_tracker.confidence(locked_id) > 0.7: beep_trigger = 1
 
 
                # --- TRACKING / SEARCH LOGIC ---
@@ -367,19 +461,16 @@ def ai_logic_loop():
                    obj_x = int((x1 + x2) / 2)
                    obj_y = int((y1 + y2) / 2)
                   
-                   # Visuals
+                   # Visuals (other candidates in gray)
+                   for track_id, (tx1, ty1, tx2, ty2), _, _ in object_tracker.tracks():
+                       if track_id != locked_id:
+                           cv2.rectangle(frame_bgr, (tx1, ty1), (tx2, ty2), (128, 128, 128), 1)
                    cv2.rectangle(frame_bgr, (x1, y1), (x2, y2), (0, 255, 0), 2)
                    cv2.circle(frame_bgr, (obj_x, obj_y), 5, (0, 0, 255), -1)
-                   cv2.putText(frame_bgr, "TRASH", (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 2)
-                  
-                   # Tracking Calculation
-                   if obj_x < center_x - margin: curr_x += step
-                   elif obj_x > center_x + margin: curr_x -= step
-                   if obj_y < center_y - margin: curr_y -= step
-                   elif obj_y > center_y + margin: curr_y += step
+                   cv2.putText(frame_bgr, f"TRASH #{locked_id}", (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 2)
                   
-                   curr_x = max(0, min(180, curr_x))
-                   curr_y = max(85, min(95, curr_y))
+                   # PID toward the box center; tracker velocity damps the motion
+                   curr_x, curr_y = servo.update((obj_x, obj_y), frame.timestamp, object_tracker.velocity(locked_id))
                   
                    system_status = "LOCKED ON TARGET"
                    search_start_time = time.time()
@@ -393,9 +484,8 @@ def ai_logic_loop():
                        # PHASE 1: MOVE (0-12s)
                        if search_phase != "MOVE":
                            if ser:
-                               with serial_lock:
-                                   ser.write(b'T\n')
-                                   print("⚡ Auto: Starting Move Phase")
+                               uart_write(b'T\n')
+                               log.info("⚡ Auto: Starting Move Phase")
                            search_phase = "MOVE"
                       
                        curr_x = 90
@@ -407,9 +497,8 @@ def ai_logic_loop():
                        # PHASE 2: SWEEP (12s-20s)
                        if search_phase != "SWEEP":
                            if ser:
-                               with serial_lock:
-                                   ser.write(b'S\n') # Stop robot
-                                   print("⚡ Auto: Starting Sweep Phase")
+                               uart_write(b'S\n') # Stop robot
+                               log.info("⚡ Auto: Starting Sweep Phase")
                            search_phase = "SWEEP"
                       
                        system_status = f"SEARCH: SWEEP ({int(20-elapsed)}s)"
@@ -436,14 +525,22 @@ def ai_logic_loop():
                        cv2.putText(frame_bgr, "SCANNING...", (50, rows - 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0,255,255), 2)
 
 
-               # Send Data to ESP32
-               if ser:
-                   with serial_lock:
-                       msg = f"{curr_x},{curr_y},{beep_trigger}\n"
-                       ser.write(msg.encode('utf-8'))
+               # Search/idle moves steer the head directly; the PID only drives it while locked
+               if not last_box:
+                   servo.set_angles(curr_x, curr_y)
+
+
+               # Send Data to ESP32 only when the angles change (never from a frame that is already too old)
+               if frame_mailbox.is_stale(frame):
+                   frame_mailbox.mark_stale(frame)
+               else:
+                   msg = servo.command(beep_trigger, frame.timestamp)
+                   if msg: uart_write(msg.encode('utf-8'))
+                   frame_mailbox.mark_processed(frame, servo_sent=msg is not None)
 
 
            else:
+               frame_mailbox.mark_processed(frame)
                # Manual Mode Visuals
                if time.time() > override_timer:
                    is_manual_override = False
@@ -455,31 +552,40 @@ def ai_logic_loop():
            cv2.putText(frame_bgr, system_status, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
 
 
-           ret, buffer = cv2.imencode('.jpg', frame_bgr)
-           if ret:
-               with frame_lock: global_frame_jpg = buffer.tobytes()
+           # Hand the frame to the stream hub; JPEG encoding happens on demand
+           stream_hub.publish(frame_bgr)
+           metrics.observe("frame", time.monotonic() - loop_start)
+           scheduler.record_frame(time.monotonic() - loop_start, frame.timestamp)
 
 
        except Exception as e:
-           print(f"⚠️ Loop Error: {e}")
+           metrics.inc("loop_errors")
+           # Error yang berulang tiap frame cukup dicatat sekali per 5 detik (dengan traceback)
+           log.sampled("loop_error", 5.0, "⚠️ Loop Error", logging.ERROR, exc_info=True, error=str(e))
            time.sleep(0.1)
 
 
 if __name__ == '__main__':
-   print("🚀 STARTING HYBRID SYSTEM...")
+   log.info("🚀 STARTING HYBRID SYSTEM")
   
    # Handle clean exit
    def signal_handler(sig, frame):
-       print("\n🛑 Shutting down...")
-       if picam2: picam2.stop()
+       log.info("🛑 Shutting down...")
+       if camera: camera.stop()
        if ser: ser.close()
+       model_worker.close()
+       frame_ring.close()
        sys.exit(0)
    signal.signal(signal.SIGINT, signal_handler)
 
 
+   capture_thread = threading.Thread(target=capture_loop, daemon=True)
+   capture_thread.start()
+
    vision_thread = threading.Thread(target=ai_logic_loop)
    vision_thread.daemon = True
    vision_thread.start()
+   metrics.start_summary_logger(interval=30, log=log.info)
   
    # Run Flask
    app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
@@ -0,0 +1,106 @@
+# ==========================================
+# DETECT -> TRACK -> CLASSIFY MATERIAL
+# ==========================================
+# 1. YOLO finds bottles/cups (COCO 39/41)
+# 2. MultiObjectTracker keeps a stable ID per object
+# 3. The ONNX garbage classifier (classify.py, best.onnx) labels each
+#    object's crop -- only for new tracks or stale labels (material_cache.py)
+# UART: material class ID of the locked object ("3\n", same as classify.py),
+# sent only when it changes.
+
+from frame_source import open_source
+from multi_tracker import MultiObjectTracker
+from detections import yolo_detections
+from material_cache import MaterialCache
+import classify
+from ultralytics import YOLO
+import cv2
+import serial
+import time
+
+# =======================
+# CONFIGURATION
+# =======================
+SERIAL_PORT = "/dev/serial0"
+BAUDRATE = 115200
+
+DETECT_MODEL = "yolov8n.pt"
+CONF_THRESHOLD = 0.4
+TARGET_POLICY = "lock"    # lock / largest / center
+LABEL_MAX_AGE = 3.0       # Seconds before a track's material is re-checked
+LABEL_MIN_CONF = 0.6      # Unsure labels are retried sooner
+
+
+def main():
+    print("Loading Models... Please wait.")
+    model = YOLO(DETECT_MODEL)
+    classify.load_model()
+    materials = MaterialCache(classify.classify_batch, classify.classes,
+                              max_age=LABEL_MAX_AGE, min_confidence=LABEL_MIN_CONF)
+
+    try:
+        ser = serial.Serial(SERIAL_PORT, baudrate=BAUDRATE, timeout=0.1)
+        print(f"Connected to ESP32 on {SERIAL_PORT}")
+    except Exception:
+        print("WARNING: ESP32 NOT CONNECTED (Simulation Mode)")
+        ser = None
+
+    camera = open_source(size=(640, 480))  # FRAME_SOURCE env picks camera/recording
+    time.sleep(1)
+
+    tracker = MultiObjectTracker(max_tracks=8, max_age=0.5)
+    locked_id = None
+    last_sent = None
+    fps_time, fps_counter, fps = time.time(), 0, 0
+
+    print("SYSTEM READY. Press 'q' to quit.")
+    try:
+        while True:
+            frame_rgb = camera.capture_array()
+            frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
+            now = time.monotonic()
+
+            # 1 + 2: detect and track
+            results = model(frame_bgr, imgsz=192, verbose=False, conf=CONF_THRESHOLD)
+            tracker.update(yolo_detections(results), now)
+            locked_id, _ = tracker.select_target(TARGET_POLICY, frame_bgr.shape, locked_id)
+
+            # 3: classify only the crops that need it (one batch), before drawing on the frame
+            tracks = tracker.tracks()
+            materials.update(frame_bgr, tracks, now)
+
+            for track_id, (x1, y1, x2, y2), _, _ in tracks:
+                label = materials.get(track_id)
+                text = f"#{track_id} {label[0]} {label[2]:.0%}" if label else f"#{track_id} ..."
+                color = (0, 255, 0) if track_id == locked_id else (128, 128, 128)
+                cv2.rectangle(frame_bgr, (x1, y1), (x2, y2), color, 2)
+                cv2.putText(frame_bgr, text, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+            # UART: material of the locked object, only on change
+            label = materials.get(locked_id) if locked_id is not None else None
+            if ser and label and label[1] != last_sent:
+                try:
+                    ser.write(f"{label[1]}\n".encode("utf-8"))
+                    last_sent = label[1]
+                except Exception as e:
+                    print("UART write error:", e)
+
+            fps_counter += 1
+            if time.time() - fps_time > 1.0:
+                fps, fps_counter, fps_time = fps_counter, 0, time.time()
+            stats = materials.stats()
+            cv2.putText(frame_bgr, f"FPS: {fps}  classified: {stats['material_classified']}",
+                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+            cv2.imshow("Detect + Classify", frame_bgr)
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+
+    finally:
+        camera.stop()
+        if ser: ser.close()
+        cv2.destroyAllWindows()
+        print(materials.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+# ==========================================
+# DETECTIONS (Common Array Format)
+# ==========================================
+# Detector output is passed around as one float32 array of shape (N, 6):
+#   [x1, y1, x2, y2, confidence, class_id]
+# so trackers and filters can work on whole arrays instead of looping
+# over Ultralytics Box objects.
+
+import numpy as np
+
+
+TARGET_CLASSES = (39, 41)  # COCO: 39=Bottle, 41=Cup
+EMPTY = np.zeros((0, 6), dtype=np.float32)
+
+
+def yolo_detections(results, classes=TARGET_CLASSES):
+    """Ultralytics results -> (N, 6) array, keeping only `classes`."""
+    chunks = []
+    for r in results:
+        data = r.boxes.data
+        if len(data):
+            chunks.append(data[:, :6].cpu().numpy().astype(np.float32))
+    if not chunks:
+        return EMPTY
+    dets = np.concatenate(chunks)
+    if classes is not None:
+        dets = dets[np.isin(dets[:, 5].astype(int), classes)]
+    return dets
@@ -0,0 +1,81 @@
+# ==========================================
+# FRAME MAILBOX (Latest Frame Wins)
+# ==========================================
+# Single-slot handoff between the capture thread and the vision loop.
+# The capture thread always overwrites the slot, so when inference stalls
+# old frames are dropped instead of queueing up, and the vision loop always
+# works on the freshest image. Every frame carries its capture timestamp
+# (time.monotonic()), which gives us frame age and glass-to-servo latency.
+
+import threading
+import time
+from collections import namedtuple
+
+from metrics import metrics
+
+
+Frame = namedtuple("Frame", "seq timestamp image")
+
+
+class FrameMailbox:
+    def __init__(self, max_age=0.25):
+        self.max_age = max_age  # Seconds; older frames must not drive the servos
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+
+        # Counters
+        self.captured = 0
+        self.dropped = 0      # Overwritten before the vision loop took them
+        self.stale = 0        # Taken, but too old to act on
+        self.processed = 0
+
+    # =======================
+    # CAPTURE SIDE
+    # =======================
+    def put(self, image, timestamp=None, seq=None):
+        """`seq` lets frames keep the sequence number of the ring they live in."""
+        with self._cond:
+            if self._frame is not None:
+                self.dropped += 1
+            self._seq = self._seq + 1 if seq is None else seq
+            self.captured += 1
+            self._frame = Frame(self._seq, timestamp or time.monotonic(), image)
+            self._cond.notify()
+            return self._frame
+
+    # =======================
+    # VISION SIDE
+    # =======================
+    def get(self, timeout=1.0):
+        """Take the newest frame (empties the slot). None on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._frame is not None, timeout):
+                return None
+            frame, self._frame = self._frame, None
+            return frame
+
+    def age(self, frame, now=None):
+        return (now or time.monotonic()) - frame.timestamp
+
+    def is_stale(self, frame, now=None):
+        return self.age(frame, now) > self.max_age
+
+    def mark_stale(self, frame):
+        self.stale += 1
+        metrics.observe("frame_age", self.age(frame))
+
+    def mark_processed(self, frame, servo_sent=False):
+        now = time.monotonic()
+        self.processed += 1
+        metrics.observe("frame_age", now - frame.timestamp)
+        if servo_sent:
+            metrics.observe("glass_to_servo", now - frame.timestamp)
+
+    def stats(self):
+        return {
+            "frames_captured": self.captured,
+            "frames_dropped": self.dropped,
+            "frames_stale": self.stale,
+            "frames_processed": self.processed,
+        }
@@ -0,0 +1,268 @@
+# ==========================================
+# SHARED-MEMORY FRAME RING
+# ==========================================
+# Fixed number of frame slots in one multiprocessing.shared_memory block.
+# The capture thread writes each frame once (sources can even capture
+# straight into the slot, see FrameSource.capture_into); the detector,
+# classifier, recorder and streamer then read the *same* memory by sequence
+# number -- in this process or in another one that attached by name --
+# instead of each getting its own copy.
+#
+# Protocol (one writer, any number of readers, no locks):
+#   writer:  seq, slot = ring.claim()     slot seq is set to 0 = "being written"
+#            fill slot in place
+#            ring.commit(seq, timestamp)  slot seq = seq, then head = seq
+#   reader:  frame = ring.get(seq) / ring.latest()   zero-copy view
+#            ... use frame.image ...
+#            ring.valid(frame.seq)       False if the writer lapped the slot
+#                                        meanwhile -> discard what was computed
+# With N slots a reader has N-1 frame periods (8 slots @ 30 fps ~ 230 ms)
+# before its slot is reused.
+#
+# Benchmark (copy bytes saved vs one copy per consumer):
+#   python frame_ring.py --readers 4 --fps 30
+
+import argparse
+import json
+import multiprocessing as mp
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+RingFrame = namedtuple("RingFrame", "seq timestamp image")
+
+_HEADER_ALIGN = 64
+
+
+class FrameRing:
+    def __init__(self, shape=(480, 640, 3), slots=8, name=None, create=True, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        header = 8 * (2 * slots + 1)
+        header = (header + _HEADER_ALIGN - 1) // _HEADER_ALIGN * _HEADER_ALIGN
+        frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=header + frame_bytes * slots)
+        else:
+            try:
+                # Python 3.13+: don't let this process' resource tracker unlink the owner's block
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                self.shm = shared_memory.SharedMemory(name=name)
+        self.owner = create
+
+        buf = self.shm.buf
+        self._seqs = np.ndarray((slots,), dtype=np.int64, buffer=buf, offset=0)
+        self._stamps = np.ndarray((slots,), dtype=np.float64, buffer=buf, offset=8 * slots)
+        self._head = np.ndarray((1,), dtype=np.int64, buffer=buf, offset=16 * slots)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=buf, offset=header)
+        if create:
+            self._seqs[:] = 0
+            self._head[0] = 0
+
+        # Counters (per process)
+        self.written = 0
+        self.reads = 0
+        self.overruns = 0   # Reads that found their slot already reused
+
+    @classmethod
+    def attach(cls, name, shape=(480, 640, 3), slots=8, dtype=np.uint8):
+        """Open an existing ring from another process."""
+        return cls(shape, slots, name=name, create=False, dtype=dtype)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def frame_bytes(self):
+        return self.frames[0].nbytes
+
+    # =======================
+    # WRITER
+    # =======================
+    def claim(self):
+        """Next (seq, slot view) to fill in place; call commit() when done."""
+        seq = int(self._head[0]) + 1
+        slot = seq % self.slots
+        self._seqs[slot] = 0
+        return seq, self.frames[slot]
+
+    def commit(self, seq, timestamp=None):
+        slot = seq % self.slots
+        self._stamps[slot] = time.monotonic() if timestamp is None else timestamp
+        self._seqs[slot] = seq
+        self._head[0] = seq
+        self.written += 1
+
+    def write(self, image, timestamp=None):
+        """Copy `image` into the next slot. Returns its seq."""
+        seq, slot = self.claim()
+        np.copyto(slot, image)
+        self.commit(seq, timestamp)
+        return seq
+
+    # =======================
+    # READERS
+    # =======================
+    @property
+    def head(self):
+        """Seq of the newest committed frame (0 = nothing written yet)."""
+        return int(self._head[0])
+
+    def valid(self, seq):
+        ok = seq > 0 and int(self._seqs[seq % self.slots]) == seq
+        if not ok:
+            self.overruns += 1
+        return ok
+
+    def get(self, seq):
+        """Zero-copy RingFrame for `seq`, or None if it is gone/not written."""
+        slot = seq % self.slots
+        if seq <= 0 or int(self._seqs[slot]) != seq:
+            self.overruns += 1
+            return None
+        self.reads += 1
+        return RingFrame(seq, float(self._stamps[slot]), self.frames[slot])
+
+    def latest(self):
+        seq = self.head
+        return self.get(seq) if seq else None
+
+    def wait_next(self, after_seq, timeout=1.0, poll=0.002):
+        """Poll until a frame newer than `after_seq` is committed (works across processes)."""
+        deadline = time.monotonic() + timeout
+        while self.head <= after_seq:
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(poll)
+        return self.latest()
+
+    def stats(self):
+        return {
+            "ring_frames_written": self.written,
+            "ring_reads": self.reads,
+            "ring_overruns": self.overruns,
+        }
+
+    def close(self):
+        # Views into the buffer must go before the mapping can be closed
+        self._seqs = self._stamps = self._head = self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# =======================
+# BENCHMARK
+# =======================
+def _process_reader(name, shape, slots, frames, result):
+    """Reader in another process: follow the ring, touch every frame it sees."""
+    ring = FrameRing.attach(name, shape, slots)
+    seen = torn = 0
+    last = 0
+    deadline = time.monotonic() + 30
+    while last < frames and time.monotonic() < deadline:
+        frame = ring.wait_next(last, timeout=1.0)
+        if frame is None:
+            continue
+        last = frame.seq
+        frame.image[::8, ::8].sum()   # Stand-in for real work on the shared pixels
+        if ring.valid(frame.seq):
+            seen += 1
+        else:
+            torn += 1
+    result.put({"frames_seen": seen, "frames_overrun": torn})
+    ring.close()
+
+
+def _paced(frames, fps, work):
+    """Call work(i) at `fps` like a camera would; returns mean busy seconds per frame."""
+    busy = 0.0
+    period = 1.0 / fps
+    for i in range(frames):
+        frame_start = time.perf_counter()
+        work(i)
+        elapsed = time.perf_counter() - frame_start
+        busy += elapsed
+        if elapsed < period:
+            time.sleep(period - elapsed)
+    return busy / frames
+
+
+def benchmark(readers=4, frames=300, shape=(480, 640, 3), slots=8, fps=30.0):
+    """
+    Every captured frame goes to `readers` consumers.
+      copy: each consumer gets (and holds) its own frame.copy()
+      ring: the frame is written into the ring once, consumers take views
+    Also runs one extra consumer in a separate process attached by name.
+    """
+    rng = np.random.default_rng(0)
+    source = [rng.integers(0, 256, shape, dtype=np.uint8) for _ in range(4)]
+    frame_bytes = source[0].nbytes
+
+    held = [None] * readers
+
+    def copy_frame(i):
+        image = source[i % len(source)]
+        for r in range(readers):
+            held[r] = image.copy()
+
+    copy_seconds = _paced(frames, fps, copy_frame)
+
+    ring = FrameRing(shape, slots)
+    ctx = mp.get_context("spawn")
+    result = ctx.Queue()
+    reader = ctx.Process(target=_process_reader, args=(ring.name, shape, slots, frames, result))
+    reader.start()
+    time.sleep(1.0)  # Let the reader attach before writing
+
+    def ring_frame(i):
+        seq = ring.write(source[i % len(source)])
+        for r in range(readers):
+            held[r] = ring.get(seq)
+            ring.valid(seq)
+
+    ring_seconds = _paced(frames, fps, ring_frame)
+    held = None
+    process_reader = result.get(timeout=30)
+    reader.join()
+    ring_stats = ring.stats()
+    ring.close()
+
+    copy_bytes = readers * frame_bytes
+    ring_bytes = frame_bytes
+    return {
+        "frame_bytes": frame_bytes,
+        "readers": readers,
+        "fps": fps,
+        "copy": {
+            "bytes_copied_per_frame": copy_bytes,
+            "copy_ms_per_frame": round(copy_seconds * 1000, 3),
+        },
+        "ring": {
+            "bytes_copied_per_frame": ring_bytes,
+            "copy_ms_per_frame": round(ring_seconds * 1000, 3),
+            **ring_stats,
+            "process_reader": process_reader,
+        },
+        "copy_bytes_saved_per_second": int((copy_bytes - ring_bytes) * fps),
+        "copy_ms_saved_per_second": round((copy_seconds - ring_seconds) * fps * 1000, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared-memory frame ring benchmark")
+    parser.add_argument("--readers", type=int, default=4, help="Consumers per frame (detector, classifier, recorder, streamer)")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--slots", type=int, default=8)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.readers, args.frames, (args.height, args.width, 3), args.slots, args.fps), indent=2))
@@ -0,0 +1,333 @@
+# ==========================================
+# FRAME SOURCES (Camera Abstraction)
+# ==========================================
+# Every source behaves like Picamera2: capture_array() returns an RGB
+# HxWx3 uint8 frame and stop() releases the device. This lets the same
+# pipeline run on the robot (Picamera2), on a USB webcam (V4L2) or on a
+# plain Linux box from recordings or a synthetic moving target.
+#
+# Frames are delivered without extra copies. Sources that replay stored
+# data hand out read-only views of preloaded arrays, so consumers must
+# copy a frame before drawing on it (cv2.cvtColor already does that).
+# capture_into(out) fills a preallocated frame instead, e.g. a slot of the
+# shared-memory ring in frame_ring.py.
+#
+# Pick a source with the FRAME_SOURCE environment variable:
+#   picamera2              Raspberry Pi camera (default)
+#   v4l2[:N]               /dev/videoN through OpenCV
+#   video:PATH             video file (mp4/avi/...)
+#   dir:PATH               folder of images, e.g. frame_0.jpg
+#   raw:PATH               frame.raw (RGB888 dump) or .ppm files
+#   synthetic              generated frames with a moving target
+# Append "@FPS" to pace playback, e.g. "dir:recordings@30".
+
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+
+DEFAULT_SIZE = (640, 480)
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".h264")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".ppm")
+
+
+class FrameSource:
+    """Base class. Subclasses implement _read() returning an RGB frame."""
+
+    def __init__(self, fps=None):
+        self.fps = fps
+        self._next_frame_time = None
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+    def capture_array(self):
+        self._pace()
+        return self._read()
+
+    def capture_into(self, out):
+        """Capture into the preallocated RGB array `out` and return it."""
+        self._pace()
+        return self._read_into(out)
+
+    def _read(self):
+        raise NotImplementedError
+
+    def _read_into(self, out):
+        np.copyto(out, self._read())
+        return out
+
+    def _pace(self):
+        """Sleep so frames come out at `fps` (no-op when fps is None)."""
+        if not self.fps:
+            return
+        now = time.monotonic()
+        if self._next_frame_time is None:
+            self._next_frame_time = now
+        delay = self._next_frame_time - now
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Running behind: don't try to catch up with a burst
+            self._next_frame_time = now
+        self._next_frame_time += 1.0 / self.fps
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+# =======================
+# LIVE CAMERAS
+# =======================
+class Picamera2Source(FrameSource):
+    def __init__(self, size=DEFAULT_SIZE, fps=None, controls=None, buffer_count=None):
+        super().__init__(fps)
+        from picamera2 import Picamera2  # Only needed on the Pi
+
+        self.cam = Picamera2()
+        options = {"main": {"size": tuple(size), "format": "RGB888"}}
+        if controls:
+            options["controls"] = controls
+        if buffer_count:
+            options["buffer_count"] = buffer_count
+        self.cam.configure(self.cam.create_preview_configuration(**options))
+
+    def start(self):
+        self.cam.start()
+        return self
+
+    def stop(self):
+        self.cam.stop()
+
+    def _read(self):
+        return self.cam.capture_array()
+
+
+class OpenCVCaptureSource(FrameSource):
+    """cv2.VideoCapture wrapper used for V4L2 devices and video files."""
+
+    def __init__(self, target, api=cv2.CAP_ANY, size=None, fps=None, loop=False):
+        super().__init__(fps)
+        self.target = target
+        self.loop = loop
+        self.cap = cv2.VideoCapture(target, api)
+        if not self.cap.isOpened():
+            raise IOError(f"Cannot open {target}")
+        if size:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+        self._bgr = None
+
+    def stop(self):
+        self.cap.release()
+
+    def _grab(self):
+        # Decode into the same BGR buffer every time
+        ret, self._bgr = self.cap.read(self._bgr)
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, self._bgr = self.cap.read(self._bgr)
+        if not ret:
+            raise EOFError(f"No more frames from {self.target}")
+        return self._bgr
+
+    def _read(self):
+        return cv2.cvtColor(self._grab(), cv2.COLOR_BGR2RGB)
+
+    def _read_into(self, out):
+        # The color conversion writes straight into `out`: no extra copy
+        return cv2.cvtColor(self._grab(), cv2.COLOR_BGR2RGB, dst=out)
+
+
+class V4L2Source(OpenCVCaptureSource):
+    def __init__(self, device=0, size=DEFAULT_SIZE, fps=None):
+        super().__init__(device, cv2.CAP_V4L2, size=size, fps=fps)
+
+
+class VideoFileSource(OpenCVCaptureSource):
+    def __init__(self, path, fps=None, loop=True):
+        super().__init__(path, size=None, fps=fps, loop=loop)
+
+
+# =======================
+# RECORDED FRAMES
+# =======================
+class ArraySource(FrameSource):
+    """Replays a list of preloaded RGB frames, handing out read-only views."""
+
+    def __init__(self, frames, fps=None, loop=True):
+        super().__init__(fps)
+        if not frames:
+            raise ValueError("No frames to replay")
+        self.frames = frames
+        for frame in self.frames:
+            frame.flags.writeable = False
+        self.loop = loop
+        self.index = 0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def _read(self):
+        if self.index >= len(self.frames):
+            if not self.loop:
+                raise EOFError("End of recording")
+            self.index = 0
+        frame = self.frames[self.index]
+        self.index += 1
+        return frame
+
+
+class ImageDirectorySource(ArraySource):
+    def __init__(self, path, fps=None, loop=True):
+        if os.path.isdir(path):
+            files = sorted(
+                f for f in glob.glob(os.path.join(path, "*"))
+                if f.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            files = sorted(glob.glob(path))  # Single file or glob pattern
+        frames = []
+        for f in files:
+            bgr = cv2.imread(f, cv2.IMREAD_COLOR)
+            if bgr is not None:
+                frames.append(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+        super().__init__(frames, fps=fps, loop=loop)
+
+
+class RawFileSource(ArraySource):
+    """
+    frame.raw: back-to-back RGB888 frames of `size` (as dumped from capture_array()).
+    *.ppm:     binary P6 file(s) such as frame-cam0-stream0-000000.ppm.
+    The file is memory-mapped, so every frame is a view into it.
+    """
+
+    def __init__(self, path, size=DEFAULT_SIZE, fps=None, loop=True):
+        if path.lower().endswith(".ppm"):
+            frames = [read_ppm(p) for p in sorted(glob.glob(path))]
+        else:
+            frames = read_raw_rgb(path, size)
+        super().__init__(frames, fps=fps, loop=loop)
+
+
+def read_ppm(path):
+    with open(path, "rb") as f:
+        tokens = []
+        while len(tokens) < 4:
+            line = f.readline()
+            if not line:
+                raise ValueError(f"{path}: truncated PPM header")
+            tokens += line.split(b"#")[0].split()
+        offset = f.tell()
+    magic, width, height, maxval = tokens[0], int(tokens[1]), int(tokens[2]), int(tokens[3])
+    if magic != b"P6" or maxval > 255:
+        raise ValueError(f"{path}: only 8-bit binary PPM (P6) is supported")
+    data = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(height, width, 3))
+    return data.view(np.ndarray)
+
+
+def read_raw_rgb(path, size=DEFAULT_SIZE):
+    width, height = size
+    frame_bytes = width * height * 3
+    count = os.path.getsize(path) // frame_bytes
+    if count == 0:
+        raise ValueError(f"{path}: smaller than one {width}x{height} RGB888 frame")
+    data = np.memmap(path, dtype=np.uint8, mode="r", shape=(count, height, width, 3))
+    return list(data.view(np.ndarray))
+
+
+# =======================
+# SYNTHETIC TARGET
+# =======================
+class SyntheticSource(FrameSource):
+    """
+    Gray background with a bottle-like box moving on a Lissajous path.
+    `target_box` holds the ground-truth (x1, y1, x2, y2) of the last frame.
+    Frames are rendered into a small ring of reusable buffers.
+    """
+
+    def __init__(self, size=DEFAULT_SIZE, fps=30, speed=1.0, box_size=(60, 140), ring=4):
+        super().__init__(fps)
+        self.width, self.height = size
+        self.speed = speed
+        self.box_w, self.box_h = box_size
+        self.t = 0.0
+        self.target_box = None
+
+        gradient = np.linspace(60, 140, self.width, dtype=np.uint8)
+        self._background = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._background[:] = gradient[None, :, None]
+        self._buffers = [np.empty_like(self._background) for _ in range(ring)]
+        self._slot = 0
+
+    def _read(self):
+        frame = self._buffers[self._slot]
+        self._slot = (self._slot + 1) % len(self._buffers)
+        np.copyto(frame, self._background)
+
+        # Simulated time follows the nominal frame rate, not the wall clock
+        self.t += self.speed / (self.fps or 30)
+        cx = int(self.width / 2 + 0.35 * self.width * np.sin(self.t * 0.9))
+        cy = int(self.height / 2 + 0.25 * self.height * np.sin(self.t * 1.7))
+        x1, y1 = cx - self.box_w // 2, cy - self.box_h // 2
+        x2, y2 = x1 + self.box_w, y1 + self.box_h
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (40, 160, 220), -1)
+        cv2.rectangle(frame, (cx - 12, y1 - 25), (cx + 12, y1), (230, 230, 230), -1)  # Cap
+        self.target_box = (x1, y1 - 25, x2, y2)
+        return frame
+
+
+# =======================
+# FACTORY
+# =======================
+def open_source(spec=None, size=DEFAULT_SIZE, fps=None, **camera_options):
+    """
+    Build and start a frame source from a spec string (see top of file).
+    `camera_options` (controls, buffer_count) only apply to Picamera2.
+    """
+    spec = spec or os.environ.get("FRAME_SOURCE", "picamera2")
+    if "@" in spec:
+        spec, fps_text = spec.rsplit("@", 1)
+        fps = float(fps_text)
+
+    kind, _, arg = spec.partition(":")
+    if kind not in ("picamera2", "v4l2", "video", "dir", "raw", "synthetic"):
+        # Bare path: guess from what is on disk
+        arg, kind = spec, _guess_kind(spec)
+
+    if kind == "picamera2":
+        source = Picamera2Source(size=size, fps=fps, **camera_options)
+    elif kind == "v4l2":
+        source = V4L2Source(int(arg or 0), size=size, fps=fps)
+    elif kind == "video":
+        source = VideoFileSource(arg, fps=fps)
+    elif kind == "dir":
+        source = ImageDirectorySource(arg, fps=fps)
+    elif kind == "raw":
+        source = RawFileSource(arg, size=size, fps=fps)
+    else:
+        source = SyntheticSource(size=size, fps=fps or 30)
+    return source.start()
+
+
+def _guess_kind(path):
+    lower = path.lower()
+    if os.path.isdir(path):
+        return "dir"
+    if lower.endswith((".raw", ".ppm")):
+        return "raw"
+    if lower.endswith(VIDEO_EXTENSIONS):
+        return "video"
+    if lower.endswith(IMAGE_EXTENSIONS) or "*" in path:
+        return "dir"
+    raise ValueError(f"Unknown frame source: {path}")
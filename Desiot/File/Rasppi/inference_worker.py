@@ -0,0 +1,153 @@
+# ==========================================
+# OUT-OF-PROCESS INFERENCE WORKER
+# ==========================================
+# Runs YOLO in its own process so the model's Python-side pre/post-processing
+# no longer competes for the GIL with Flask, the MJPEG generators, UART and
+# the tracking loop. The worker reads frames straight out of the shared
+# FrameRing (frame_ring.py) the capture thread writes into, so a request is
+# just (ring seq, ROI, imgsz) and only (N, 6) detection arrays come back
+# through the result queue.
+#
+#   ring = FrameRing((480, 640, 3), slots=8)
+#   worker = InferenceWorker("yolov8n.pt", ring)
+#   if worker.can_submit: worker.submit(seq, timestamp, region, imgsz)
+#   result = worker.poll()          # non-blocking, None until a result is ready
+#
+# The worker is forked, so create it before starting threads, the camera or
+# the log thread (the first async_log.get_logger() call).
+
+import logging
+import multiprocessing as mp
+import queue
+import time
+from collections import namedtuple
+
+import cv2
+
+from detections import EMPTY, TARGET_CLASSES, yolo_detections
+from frame_ring import FrameRing
+
+
+Result = namedtuple("Result", "seq timestamp region detections seconds")
+
+# Plain stdlib logger: importing this module must not start the log thread before the fork
+log = logging.getLogger("inference_worker")
+
+
+def _serve(ring_spec, model_file, conf, classes, requests, results):
+    """Worker process: load the model once, then answer requests until None."""
+    try:
+        from ultralytics import YOLO
+        model = YOLO(model_file)
+        ring = FrameRing.attach(*ring_spec)
+    except Exception as e:
+        results.put(("error", repr(e)))
+        return
+    results.put(("ready", None))
+
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        seq, timestamp, region, imgsz = request
+        frame = ring.get(seq)
+        if frame is None:
+            results.put(("stale", seq))
+            continue
+        x0, y0, x1, y1 = region
+        # Ring frames are RGB; converting only the crop also makes the model's private copy
+        image = cv2.cvtColor(frame.image[y0:y1, x0:x1], cv2.COLOR_RGB2BGR)
+        if not ring.valid(seq):
+            results.put(("stale", seq))  # Capture lapped the slot while we converted
+            continue
+        start = time.monotonic()
+        try:
+            dets = yolo_detections(model(image, imgsz=imgsz, verbose=False, conf=conf), classes)
+        except Exception as e:
+            results.put(("error", repr(e)))
+            dets = EMPTY
+        results.put(Result(seq, timestamp, region, dets, time.monotonic() - start))
+    ring.close()
+
+
+class InferenceWorker:
+    def __init__(self, model_file, ring, max_in_flight=2, conf=0.4, classes=TARGET_CLASSES):
+        self.ring = ring
+        self.max_in_flight = max_in_flight
+
+        ctx = mp.get_context("fork")
+        self.requests = ctx.Queue()
+        self.results = ctx.Queue()
+        self.process = ctx.Process(
+            target=_serve,
+            args=((ring.name, ring.shape, ring.slots, ring.dtype), model_file, conf, classes,
+                  self.requests, self.results),
+            name="inference-worker",
+            daemon=True,
+        )
+        self.process.start()
+
+        self.ready = False
+        self.error = None
+        self.in_flight = 0
+
+        # Counters
+        self.submitted = 0
+        self.completed = 0
+        self.stale = 0      # Requests whose ring slot was reused before the worker got to it
+
+    @property
+    def can_submit(self):
+        return self.ready and self.in_flight < self.max_in_flight and self.process.is_alive()
+
+    def submit(self, seq, timestamp, region, imgsz):
+        """Queue ring frame `seq` (detect inside `region`)."""
+        if self.in_flight >= self.max_in_flight:
+            raise RuntimeError("Inference worker is busy")
+        self.requests.put((seq, timestamp, tuple(int(v) for v in region), imgsz))
+        self.in_flight += 1
+        self.submitted += 1
+
+    def poll(self, timeout=None):
+        """Next Result, or None if nothing finished (waits up to `timeout` seconds)."""
+        while True:
+            try:
+                msg = self.results.get(timeout=timeout) if timeout else self.results.get_nowait()
+            except queue.Empty:
+                return None
+            if isinstance(msg, Result):
+                self.in_flight -= 1
+                self.completed += 1
+                return msg
+            kind, detail = msg
+            if kind == "ready":
+                self.ready = True
+            elif kind == "stale":
+                self.in_flight -= 1
+                self.stale += 1
+            else:
+                self.error = detail
+                log.error("❌ Inference Worker Error: %s", detail)
+
+    def wait_ready(self, timeout=60.0):
+        """Block until the model is loaded (or failed). Returns True when usable."""
+        deadline = time.monotonic() + timeout
+        while not self.ready and self.error is None and time.monotonic() < deadline:
+            self.poll(timeout=0.5)
+        return self.ready
+
+    def stats(self):
+        return {
+            "worker_submitted": self.submitted,
+            "worker_completed": self.completed,
+            "worker_stale": self.stale,
+            "worker_in_flight": self.in_flight,
+            "worker_alive": int(self.process.is_alive()),
+        }
+
+    def close(self):
+        if self.process.is_alive():
+            self.requests.put(None)
+            self.process.join(timeout=2.0)
+            if self.process.is_alive():
+                self.process.terminate()
@@ -8,7 +8,7 @@
 
 
 from flask import Flask, render_template_string, request, jsonify, Response
-from picamera2 import Picamera2
+from frame_source import open_source
 from ultralytics import YOLO
 import cv2
 import serial
@@ -19,9 +19,23 @@ import speech_recognition as sr
 from gtts import gTTS
 import pygame
 import json
+import logging
+from stream_hub import StreamHub
+from metrics import metrics
+from async_log import get_logger
+from frame_mailbox import FrameMailbox
+from scheduler import AdaptiveScheduler
+from multi_tracker import MultiObjectTracker
+from detections import yolo_detections
+from roi import RoiPlanner
+from motion_gate import MotionGate
+from servo_controller import PanTiltController, AxisPID
 import os
 
 
+log = get_logger("llm2")   # LOG_LEVEL=DEBUG/INFO/WARNING, LOG_FORMAT=json
+
+
 # =======================
 # CONFIGURATION
 # =======================
@@ -31,39 +45,47 @@ BAUDRATE = 115200
 
 # --- OPTIMIZATION ---
 HEADLESS_MODE = False     
-SKIP_FRAMES = 0           # [FIX] Set to 0 to process every frame (smoother)
+DETECT_CPU_BUDGET = 0.5   # Share of one core YOLO may use (replaces SKIP_FRAMES)
+FRAME_BUDGET = 0.15       # Seconds per frame before detection backs off
 CONF_THRESHOLD = 0.4      # Lower confidence slightly to catch more objects
 MODEL_FILE = 'yolov8n.pt'
+MAX_FRAME_AGE = 0.25      # Seconds; older frames never drive the servos
+MAX_TRACKS = 8            # Bottles/cups tracked at once
+TARGET_POLICY = "lock"    # lock (stay on current target) / largest / center
+ROI_PAD = 1.0             # Crop around a locked target, in box sizes per side
+FULL_FRAME_INTERVAL = 1.0 # Seconds between full-frame re-acquisition runs
+ROI_IMGSZ = 160           # Crops are small and square, so a smaller input suffices
+MOTION_SENSITIVITY = 0.01 # Share of the thumbnail that must change to wake YOLO when not locked
+MOTION_REFRESH = 3.0      # Seconds; YOLO still runs this often on a static scene
 
 
 # =======================
 # HARDWARE SETUP
 # =======================
-print(f"🚀 Loading Standard YOLO Model ({MODEL_FILE})...")
+log.info("🚀 Loading Standard YOLO Model", model=MODEL_FILE)
 try:
    model = YOLO(MODEL_FILE)
 except Exception as e:
-   print(f"❌ Model Error: {e}")
+   log.error("❌ Model Error", error=str(e))
    exit()
 
 
 try:
    ser = serial.Serial(SERIAL_PORT, baudrate=BAUDRATE, timeout=1)
    ser.flush()
-   print(f"✅ Connected to ESP32 on {SERIAL_PORT}")
+   log.info("✅ Connected to ESP32", port=SERIAL_PORT, baudrate=BAUDRATE)
 except:
-   print("⚠️ WARNING: ESP32 NOT CONNECTED (Simulation Mode)")
+   log.warning("⚠️ ESP32 NOT CONNECTED (Simulation Mode)")
    ser = None
 
 
 try:
-   picam2 = Picamera2()
-   config = picam2.create_preview_configuration(main={"size": (640, 480), "format": "RGB888"})
-   picam2.configure(config)
-   picam2.start()
-   print("✅ Camera Started")
+   # Set FRAME_SOURCE (see frame_source.py) to run without the Pi camera
+   camera = open_source(size=(640, 480))
+   log.info("✅ Camera Started")
 except Exception as e:
-   print(f"❌ Camera Error: {e}")
+   log.error("❌ Camera Error", error=str(e))
+   camera = None
 
 
 app = Flask(__name__)
@@ -73,13 +95,21 @@ app = Flask(__name__)
 # GLOBAL VARIABLES
 # =======================
 curr_x, curr_y = 90, 90
-step, margin = 2, 60      # [RESTORED] Original values from llm.py
+servo = PanTiltController()  # Pan 0-180, tilt 70-120
 timeout_sec = 5.0
 is_speaking = False
 is_processing_command = False
 frame_count = 0
-global_frame_jpg = None
-frame_lock = threading.Lock()
+stream_hub = StreamHub()  # Encodes JPEG only when /video_feed has viewers
+metrics.register_collector(lambda: {f"stream_{k}": v for k, v in stream_hub.stats().items()})
+frame_mailbox = FrameMailbox(max_age=MAX_FRAME_AGE)  # Capture -> vision, latest frame wins
+metrics.register_collector(frame_mailbox.stats)
+scheduler = AdaptiveScheduler(cpu_budget=DETECT_CPU_BUDGET, frame_budget=FRAME_BUDGET)
+metrics.register_collector(scheduler.stats)
+roi_planner = RoiPlanner(pad=ROI_PAD, full_frame_interval=FULL_FRAME_INTERVAL)  # Locked target -> crop only
+metrics.register_collector(roi_planner.stats)
+motion_gate = MotionGate(min_changed=MOTION_SENSITIVITY, refresh_interval=MOTION_REFRESH)  # Static scene -> no YOLO
+metrics.register_collector(motion_gate.stats)
 
 
 # Manual Override Flag
@@ -95,9 +125,10 @@ serial_lock = threading.Lock()
 system_status = "READY"
 
 
-# Last Known Box (For persistence)
+# Tracked Boxes (predicted every frame, corrected whenever YOLO runs)
 last_box = None
-last_box_time = 0
+locked_id = None
+object_tracker = MultiObjectTracker(max_tracks=MAX_TRACKS, max_age=0.5)
 
 
 # =======================
@@ -108,19 +139,28 @@ def robot_speak(text):
    def _speak():
        global is_speaking
        is_speaking = True
-       print(f"🤖 Robot: {text}")
+       log.info("🤖 Robot", text=text)
        try:
-           tts = gTTS(text=text, lang='id')
-           tts.save("/tmp/response.mp3")
-           pygame.mixer.init()
-           pygame.mixer.music.load("/tmp/response.mp3")
-           pygame.mixer.music.play()
-           while pygame.mixer.music.get_busy(): continue
-       except: pass
+           with metrics.span("tts"):
+               tts = gTTS(text=text, lang='id')
+               tts.save("/tmp/response.mp3")
+               pygame.mixer.init()
+               pygame.mixer.music.load("/tmp/response.mp3")
+               pygame.mixer.music.play()
+               while pygame.mixer.music.get_busy(): continue
+       except: metrics.inc("tts_errors")
        is_speaking = False
    threading.Thread(target=_speak).start()
 
 
+def uart_write(data):
+   """Timed write of raw bytes to the ESP32 (no-op in Simulation Mode)"""
+   if not ser: return
+   with serial_lock, metrics.span("uart"):
+       ser.write(data)
+   metrics.inc("uart_messages")
+
+
 def send_uart_command(action, duration=0):
    """Sends command to ESP32 safely using the Lock"""
    global is_manual_override, override_timer, system_status
@@ -136,20 +176,19 @@ def send_uart_command(action, duration=0):
 
    if ser:
        try:
-           with serial_lock:
-               command_str = f"{action}\n"
-               ser.write(command_str.encode('utf-8'))
-               print(f"⚡ Sent to ESP32: {command_str.strip()}")
+           command_str = f"{action}\n"
+           uart_write(command_str.encode('utf-8'))
+           log.info("⚡ Sent to ESP32", command=action, duration=duration)
           
            if duration > 0:
                def delayed_stop():
                    time.sleep(duration)
-                   with serial_lock:
-                       ser.write(b'S\n')
-                       print("⚡ Auto-Stop Sent")
+                   uart_write(b'S\n')
+                   log.info("⚡ Auto-Stop Sent", after=duration)
                threading.Thread(target=delayed_stop).start()
        except Exception as e:
-           print(f"❌ Serial Error: {e}")
+           metrics.inc("uart_errors")
+           log.error("❌ Serial Error", command=action, error=str(e))
 
 
 # =======================
@@ -210,7 +249,7 @@ HTML_PAGE = """
    </script>
 </body>
 </html>
-
+"""
 
 
 # =======================
@@ -234,9 +273,10 @@ def manual_cmd():
 @app.route('/process_voice', methods=['POST'])
 def web_voice_input():
    global system_status
+   start = time.monotonic()
    data = request.json
    text = data.get('text', '').lower()
-   print(f"🗣️ Voice: {text}")
+   log.info("🗣️ Voice", text=text)
   
    system_status = f"VOICE: {text[:15]}..."
   
@@ -262,69 +302,106 @@ def web_voice_input():
    else:
        robot_speak("Tidak kenal.")
       
+   metrics.observe("voice", time.monotonic() - start)
    return jsonify({"status": "processed"})
 
 
 @app.route('/video_feed')
 def video_feed():
    def generate():
-       while True:
-           with frame_lock:
-               if global_frame_jpg is None: continue
-               data = global_frame_jpg
-           yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + data + b'\r\n')
-           time.sleep(0.05)
+       with stream_hub.subscribe():
+           seq = 0
+           while True:
+               seq, data = stream_hub.wait_jpeg(seq)
+               if data is None: continue
+               yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + data + b'\r\n')
+               time.sleep(0.05)
    return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 
+@app.route('/stream_stats')
+def stream_stats():
+   return jsonify(stream_hub.stats())
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+   return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+# =======================
+# CAPTURE THREAD
+# =======================
+def capture_loop():
+   """Grabs frames as fast as the camera delivers them; the newest one wins"""
+   log.info("📷 Capture Thread Started")
+   while True:
+       # [ERROR CHECK] If camera times out, we catch and retry
+       try:
+           with metrics.span("capture"):
+               frame_rgb = camera.capture_array()
+       except Exception as e:
+           metrics.inc("capture_errors")
+           log.sampled("cam_io", 5.0, "⚠️ Cam IO Error", logging.WARNING, error=str(e))
+           time.sleep(0.5)
+           continue
+       frame_mailbox.put(frame_rgb)
+
+
 # =======================
 # VISION THREAD
 # =======================
 def ai_logic_loop():
-   global curr_x, curr_y, global_frame_jpg, frame_count, is_manual_override, system_status, last_box, last_box_time
-   print("🧠 AI Vision Thread Started...")
+   global curr_x, curr_y, frame_count, is_manual_override, system_status, last_box, locked_id
+   log.info("🧠 AI Vision Thread Started")
    last_seen_time = time.time()
+   beep_trigger = 0
   
    while True:
        try:
-           frame_rgb = picam2.capture_array()
-           frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
+           frame = frame_mailbox.get(timeout=1.0)
+           if frame is None: continue
+           loop_start = time.monotonic()
+           with metrics.span("convert"):
+               frame_bgr = cv2.cvtColor(frame.image, cv2.COLOR_RGB2BGR)
            rows, cols, _ = frame_bgr.shape
            center_x = cols // 2
            center_y = rows // 2
           
-           # --- DETECTION LOGIC (Runs every frame if SKIP_FRAMES=0) ---
+           # --- DETECTION LOGIC (Scheduled by load and target state) ---
            frame_count += 1
            if not is_manual_override:
               
-               # Only run costly YOLO inference occasionally if needed, but display every frame
-               # Setting skip frames to 0 means we try every loop, but Pi might lag.
-               # If laggy, change SKIP_FRAMES back to 2 or 3.
-               if frame_count % (SKIP_FRAMES + 1) == 0:
-                   results = model(frame_bgr, imgsz=192, stream=True, verbose=False, conf=CONF_THRESHOLD)
-                   found_target = False
+               # Only run costly YOLO inference when the scheduler asks for it, but display every frame.
+               # Locked/moving targets get detected often, idle scenes rarely; slow frames back it off.
+               # Tracker predicts every box on every frame; tracks die after 0.5s of missed detections
+               object_tracker.predict(frame.timestamp)
+               locked_id, last_box = object_tracker.select_target(TARGET_POLICY, frame_bgr.shape, locked_id)
+               vision_state = "LOCKED" if last_box else "IDLE"
+               # Not locked: skip frames that look the same as the last one YOLO saw
+               scene_changed = vision_state == "LOCKED" or motion_gate.changed(frame_bgr, frame.timestamp)
+               if not scene_changed:
+                   scheduler.skip(frame.timestamp, vision_state, reason="static")
+               elif scheduler.should_run(frame.timestamp, vision_state, object_tracker.speed(locked_id)):
+                   motion_gate.accept(frame.timestamp)
+                   inference_start = time.monotonic()
+                   # Locked: detect on a padded crop around the target (smaller input, more pixels on the bottle)
+                   region = roi_planner.plan(frame_bgr.shape, last_box, frame.timestamp)
+                   imgsz = 192 if roi_planner.full else ROI_IMGSZ
+                   with metrics.span("inference"):
+                       results = model(roi_planner.crop(frame_bgr, region), imgsz=imgsz, verbose=False, conf=CONF_THRESHOLD)
+                   scheduler.record_inference(time.monotonic() - inference_start, frame.timestamp)
+                   metrics.inc("detections_run")
                    beep_trigger = 0
 
 
-                   for r in results:
-                       boxes = r.boxes
-                       for box in boxes:
-                           if int(box.cls[0]) in [39, 41]: # Bottle/Cup
-                               found_target = True
-                               last_seen_time = time.time()
-                               x1, y1, x2, y2 = box.xyxy[0]
-                               last_box = (int(x1), int(y1), int(x2), int(y2))
-                               last_box_time = time.time()
-                              
-                               # Confidence check from old code
-                               if float(box.conf[0]) > 0.7: beep_trigger = 1
-                               break
-                       if found_target: break
-                  
-                   if not found_target:
-                       # Clear box if lost for > 0.5s
-                       if time.time() - last_box_time > 0.5:
-                           last_box = None
+                   with metrics.span("postprocess"):
+                       # Every bottle/cup keeps its own ID; stay on the locked one instead of the first listed
+                       object_tracker.update(roi_planner.to_frame(yolo_detections(results), region), frame.timestamp, region, frame_bgr.shape)
+                       locked_id, last_box = object_tracker.select_target(TARGET_POLICY, frame_bgr.shape, locked_id)
+                       if last_box:
+                           last_seen_time = time.time()
+                           if object_tracker.confidence(locked_id) > 0.7: beep_trigger = 1
 
 
                # --- DRAWING & TRACKING (Runs every loop for smooth servo) ---
@@ -333,26 +410,24 @@ def ai_logic_loop():
                    obj_x = int((x1 + x2) / 2)
                    obj_y = int((y1 + y2) / 2)
                   
-                   # Visuals
+                   # Visuals (other candidates in gray)
+                   for track_id, (tx1, ty1, tx2, ty2), _, _ in object_tracker.tracks():
+                       if track_id != locked_id:
+                           cv2.rectangle(frame_bgr, (tx1, ty1), (tx2, ty2), (128, 128, 128), 1)
                    cv2.rectangle(frame_bgr, (x1, y1), (x2, y2), (0, 255, 0), 2)
                    cv2.circle(frame_bgr, (obj_x, obj_y), 5, (0, 0, 255), -1)
-                   cv2.putText(frame_bgr, "TRASH", (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 2)
+                   cv2.putText(frame_bgr, f"TRASH #{locked_id}", (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 2)
                   
-                   # Original Tracking Logic (Restored from llm.py)
-                   if obj_x < center_x - margin: curr_x += step
-                   elif obj_x > center_x + margin: curr_x -= step
+                   # PID toward the box center; tracker velocity damps the motion
+                   curr_x, curr_y = servo.update((obj_x, obj_y), frame.timestamp, object_tracker.velocity(locked_id))
                   
-                   if obj_y < center_y - margin: curr_y -= step
-                   elif obj_y > center_y + margin: curr_y += step
-                  
-                   curr_x = max(0, min(180, curr_x))
-                   curr_y = max(70, min(120, curr_y))
-                  
-                   # Send tracking only if we have a target
-                   if ser:
-                       with serial_lock:
-                           msg = f"{curr_x},{curr_y},{beep_trigger}\n"
-                           ser.write(msg.encode('utf-8'))
+                   # Send tracking only if the angles changed (and the frame is still fresh)
+                   if frame_mailbox.is_stale(frame):
+                       frame_mailbox.mark_stale(frame)
+                   else:
+                       msg = servo.command(beep_trigger, frame.timestamp)
+                       if msg: uart_write(msg.encode('utf-8'))
+                       frame_mailbox.mark_processed(frame, servo_sent=msg is not None)
 
 
                elif time.time() - last_seen_time > timeout_sec:
@@ -361,13 +436,18 @@ def ai_logic_loop():
                    curr_y = 90
                    cv2.putText(frame_bgr, "SCANNING...", (50, rows - 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0,255,255), 2)
                   
-                   # Keep sending reset position so head doesn't get stuck
-                   if ser and frame_count % 10 == 0: # Don't spam reset
-                       with serial_lock:
-                           ser.write(f"90,90,0\n".encode('utf-8'))
+                   # Reset position goes out once, then as a keep-alive every second so the head doesn't get stuck
+                   servo.set_angles(curr_x, curr_y)
+                   msg = servo.command(0, frame.timestamp)
+                   if msg: uart_write(msg.encode('utf-8'))
+                   frame_mailbox.mark_processed(frame)
+
+               else:
+                   frame_mailbox.mark_processed(frame)
 
 
            else:
+               frame_mailbox.mark_processed(frame)
                # Manual Mode Visuals
                if time.time() > override_timer:
                    is_manual_override = False
@@ -379,24 +459,32 @@ def ai_logic_loop():
            cv2.putText(frame_bgr, system_status, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
 
 
-           ret, buffer = cv2.imencode('.jpg', frame_bgr)
-           if ret:
-               with frame_lock: global_frame_jpg = buffer.tobytes()
+           # Hand the frame to the stream hub; JPEG encoding happens on demand
+           stream_hub.publish(frame_bgr)
+           metrics.observe("frame", time.monotonic() - loop_start)
+           scheduler.record_frame(time.monotonic() - loop_start, frame.timestamp)
 
 
        except Exception as e:
+           metrics.inc("loop_errors")
+           # Error yang berulang tiap frame cukup dicatat sekali per 5 detik (dengan traceback)
+           log.sampled("loop_error", 5.0, "⚠️ Loop Error", logging.ERROR, exc_info=True, error=str(e))
            time.sleep(0.01)
 
 
 if __name__ == '__main__':
-   print("🚀 STARTING HYBRID SYSTEM...")
+   log.info("🚀 STARTING HYBRID SYSTEM")
+   capture_thread = threading.Thread(target=capture_loop, daemon=True)
+   capture_thread.start()
+
    vision_thread = threading.Thread(target=ai_logic_loop)
    vision_thread.daemon = True
    vision_thread.start()
+   metrics.start_summary_logger(interval=30, log=log.info)
    try:
        app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
    finally:
-       if picam2: picam2.stop()
+       if camera: camera.stop()
        if ser: ser.close()
 
 
@@ -0,0 +1,97 @@
+# ==========================================
+# PER-TRACK MATERIAL LABELS (Detect -> Classify)
+# ==========================================
+# YOLO (COCO) only knows "bottle"/"cup"; the ONNX model from classify.py
+# knows the material (cardboard/glass/metal/paper/plastic/trash) but only
+# for a whole image. MaterialCache joins them: the tracked boxes are cropped
+# and classified in one batch, and the label is cached per track ID.
+# A track is only (re)classified when
+#   - it is new,
+#   - its label is older than `max_age` seconds, or
+#   - its label was unsure (< min_confidence) and `retry_interval` passed,
+# so a steadily tracked bottle costs one classifier run, not one per frame.
+
+import numpy as np
+
+
+class MaterialCache:
+    def __init__(self, classify_batch, class_names, max_age=3.0, min_confidence=0.6,
+                 retry_interval=0.5, max_batch=4, pad=0.1):
+        self.classify_batch = classify_batch  # list of BGR crops -> (N, num_classes) probs
+        self.class_names = class_names
+        self.max_age = max_age
+        self.min_confidence = min_confidence
+        self.retry_interval = retry_interval
+        self.max_batch = max_batch            # Crops per classifier run (bounds the frame time)
+        self.pad = pad                        # Extra context around the box, share of box size
+        self.labels = {}                      # track_id -> (class_id, confidence, probs, time)
+
+        # Counters
+        self.classified = 0
+        self.batches = 0
+        self.hits = 0
+
+    def _due(self, track_id, now):
+        entry = self.labels.get(track_id)
+        if entry is None:
+            return True
+        age = now - entry[3]
+        return age >= self.max_age or (entry[1] < self.min_confidence and age >= self.retry_interval)
+
+    def crop(self, frame_bgr, box):
+        rows, cols = frame_bgr.shape[:2]
+        x1, y1, x2, y2 = box
+        px, py = int((x2 - x1) * self.pad), int((y2 - y1) * self.pad)
+        x1, y1 = max(0, x1 - px), max(0, y1 - py)
+        x2, y2 = min(cols, x2 + px), min(rows, y2 + py)
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return None
+        return frame_bgr[y1:y2, x1:x2]
+
+    def update(self, frame_bgr, tracks, now):
+        """
+        tracks: MultiObjectTracker.tracks() -> [(track_id, box, conf, cls)].
+        Classifies the tracks that need it (new ones first) and forgets
+        tracks that are gone. Returns the IDs classified this call.
+        """
+        live = {track_id for track_id, *_ in tracks}
+        for track_id in list(self.labels):
+            if track_id not in live:
+                del self.labels[track_id]
+
+        due = [(track_id, box) for track_id, box, *_ in tracks if self._due(track_id, now)]
+        # New tracks first, then the oldest labels
+        due.sort(key=lambda t: self.labels[t[0]][3] if t[0] in self.labels else -np.inf)
+
+        ids, crops = [], []
+        for track_id, box in due[:self.max_batch]:
+            crop = self.crop(frame_bgr, box)
+            if crop is not None:
+                ids.append(track_id)
+                crops.append(crop)
+        if not crops:
+            self.hits += len(tracks)
+            return []
+
+        probs = np.asarray(self.classify_batch(crops))
+        class_ids = probs.argmax(axis=1)
+        for track_id, class_id, p in zip(ids, class_ids, probs):
+            self.labels[track_id] = (int(class_id), float(p[class_id]), p, now)
+        self.classified += len(ids)
+        self.batches += 1
+        self.hits += len(tracks) - len(ids)
+        return ids
+
+    def get(self, track_id):
+        """(class_name, class_id, confidence) for a track, or None if unknown."""
+        entry = self.labels.get(track_id)
+        if entry is None:
+            return None
+        return self.class_names[entry[0]], entry[0], entry[1]
+
+    def stats(self):
+        return {
+            "material_classified": self.classified,
+            "material_batches": self.batches,
+            "material_cache_hits": self.hits,
+        }
@@ -0,0 +1,147 @@
+# ==========================================
+# METRICS (Hot-Path Stage Timing)
+# ==========================================
+# Cheap monotonic-clock spans aggregated into fixed-bucket histograms.
+# Nothing is stored per sample, so the cost per span is a clock read, a
+# bisect and a few additions. Exposed as Prometheus text on /metrics and
+# as a periodic one-line summary in the console.
+#
+#   with metrics.span("inference"):
+#       results = model(frame_bgr, ...)
+#   metrics.inc("uart_messages")
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+PREFIX = "robot"
+# Seconds; covers UART writes (~0.1 ms) up to TTS round trips (seconds)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count", "max", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += seconds
+            self.count += 1
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding quantile q (good enough for dashboards)."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return self.max
+
+
+class Metrics:
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.collectors = []
+        self._lock = threading.Lock()
+
+    # =======================
+    # RECORDING
+    # =======================
+    @contextmanager
+    def span(self, stage):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.monotonic() - start)
+
+    def observe(self, stage, seconds):
+        hist = self.histograms.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.setdefault(stage, Histogram())
+        hist.observe(seconds)
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        self.gauges[name] = value
+
+    def register_collector(self, fn):
+        """fn() -> {name: number}, read as gauges every time metrics are exported."""
+        self.collectors.append(fn)
+
+    # =======================
+    # EXPORT
+    # =======================
+    def _collected_gauges(self):
+        gauges = dict(self.gauges)
+        for fn in self.collectors:
+            try:
+                gauges.update(fn())
+            except Exception:
+                pass
+        return gauges
+
+    def render_prometheus(self):
+        lines = []
+        name = f"{PREFIX}_stage_duration_seconds"
+        lines.append(f"# TYPE {name} histogram")
+        for stage, h in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, c in zip(BUCKETS, h.counts):
+                cumulative += c
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {h.sum:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {h.count}')
+
+        for counter, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {PREFIX}_{counter}_total counter")
+            lines.append(f"{PREFIX}_{counter}_total {value}")
+
+        for gauge, value in sorted(self._collected_gauges().items()):
+            lines.append(f"# TYPE {PREFIX}_{gauge} gauge")
+            lines.append(f"{PREFIX}_{gauge} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Short text: mean/p95 per stage plus counters."""
+        parts = []
+        for stage, h in sorted(self.histograms.items()):
+            if h.count:
+                parts.append(f"{stage}={h.sum / h.count * 1000:.1f}/{h.quantile(0.95) * 1000:.0f}ms")
+        parts += [f"{k}={v}" for k, v in sorted(self.counters.items())]
+        return " ".join(parts)
+
+    def start_summary_logger(self, interval=30.0, log=print):
+        def _loop():
+            while True:
+                time.sleep(interval)
+                log(f"📊 Stats (mean/p95): {self.summary()}")
+        t = threading.Thread(target=_loop, daemon=True)
+        t.start()
+        return t
+
+
+# Shared registry for the whole process
+metrics = Metrics()
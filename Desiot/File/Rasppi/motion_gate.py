@@ -0,0 +1,65 @@
+# ==========================================
+# MOTION GATE (Skip YOLO On Static Scenes)
+# ==========================================
+# While SEARCHing or IDLE the camera often looks at the same scene for
+# seconds. Each frame is shrunk to an 80x60 grayscale thumbnail (well
+# under a millisecond with INTER_AREA) and compared with the thumbnail of the
+# last frame the detector actually saw. The detector only needs to run when
+# enough of the thumbnail changed, or when `refresh_interval` seconds passed
+# without a run (objects can appear without much motion, e.g. slowly).
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    def __init__(self, size=(80, 60), pixel_threshold=12, min_changed=0.01, refresh_interval=3.0):
+        self.size = size                          # Thumbnail (w, h)
+        self.pixel_threshold = pixel_threshold    # Gray levels a pixel must change by
+        self.min_changed = min_changed            # Share of changed pixels that counts as motion (sensitivity)
+        self.refresh_interval = refresh_interval  # Seconds; forced run even on a static scene
+        self.reference = None
+        self.reference_time = None
+        self._thumb = None
+        self._thumb_time = None
+        self.score = 0.0
+
+        # Counters
+        self.checks = 0
+        self.passed = 0
+
+    def thumbnail(self, frame_bgr):
+        small = cv2.resize(frame_bgr, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def changed(self, frame_bgr, now):
+        """True if the scene changed enough since the last accepted frame."""
+        self._thumb = self.thumbnail(frame_bgr)
+        self._thumb_time = now
+        self.checks += 1
+        if self.reference is None or now - self.reference_time >= self.refresh_interval:
+            self.score = 1.0
+        else:
+            diff = cv2.absdiff(self._thumb, self.reference)
+            self.score = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+        if self.score >= self.min_changed:
+            self.passed += 1
+            return True
+        return False
+
+    def accept(self, now):
+        """The detector ran on this frame: it becomes the new reference.
+        If the frame was never checked (gate bypassed while LOCKED), the
+        reference is dropped so the next gated frame always runs."""
+        if self._thumb_time == now:
+            self.reference = self._thumb
+            self.reference_time = now
+        else:
+            self.reference = None
+
+    def stats(self):
+        return {
+            "motion_checks": self.checks,
+            "motion_skips": self.checks - self.passed,
+            "motion_score": round(self.score, 4),
+        }
@@ -0,0 +1,213 @@
+# ==========================================
+# MULTI-OBJECT TRACKER (Stable IDs)
+# ==========================================
+# Keeps one Kalman track per object (see box_tracker.py) with a persistent
+# ID, so with two bottles in view the robot keeps following the same one
+# instead of whichever YOLO happens to list first.
+#
+# All track state lives in stacked NumPy arrays: prediction, IoU and the
+# Kalman correction are single vectorized calls regardless of track count.
+# Association uses the Hungarian algorithm (scipy) when installed and a
+# greedy best-IoU match otherwise.
+#
+# A track only ages while the detector actually looks at it: when YOLO runs
+# on a crop (roi.py), tracks outside the crop are not counted as missed and
+# keep their IDs until the next full-frame pass. A track predicted outside
+# the frame is always missed, and any track is dropped after `max_coast`
+# seconds without a detection, even when the detector did not run.
+
+import numpy as np
+
+from box_tracker import STATE_DIM, box_to_z, kf_init, kf_predict, kf_update, z_to_box
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+
+def iou_matrix(a, b):
+    """IoU between every box in a (N, 4) and b (M, 4) -> (N, M)."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:4], b[None, :, 2:4])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:4] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:4] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def _assign(iou, threshold):
+    """Return (track_idx, det_idx) pairs with IoU >= threshold."""
+    if iou.size == 0:
+        return np.empty(0, int), np.empty(0, int)
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(-iou)
+    else:
+        order = np.argsort(-iou, axis=None)
+        rows, cols = np.unravel_index(order, iou.shape)
+        used_r, used_c, keep = set(), set(), []
+        for k, (r, c) in enumerate(zip(rows, cols)):
+            if iou[r, c] < threshold:
+                break
+            if r not in used_r and c not in used_c:
+                used_r.add(r)
+                used_c.add(c)
+                keep.append(k)
+        rows, cols = rows[keep], cols[keep]
+    good = iou[rows, cols] >= threshold
+    return rows[good], cols[good]
+
+
+class MultiObjectTracker:
+    def __init__(self, max_tracks=8, iou_threshold=0.3, max_age=0.5, max_coast=2.0, min_hits=1,
+                 accel_var=500.0, meas_var=25.0):
+        self.max_tracks = max_tracks
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age        # Seconds of missed detections (while searched) before removal
+        self.max_coast = max_coast    # Seconds without any detection before removal (> full-frame interval)
+        self.min_hits = min_hits      # Detections needed before a track is reported
+        self.accel_var = accel_var
+        self.meas_var = meas_var
+
+        self.ids = np.zeros(0, dtype=int)
+        self.x = np.zeros((0, STATE_DIM))
+        self.P = np.zeros((0, STATE_DIM, STATE_DIM))
+        self.last_update = np.zeros(0)
+        self.last_missed = np.zeros(0)   # Last detector run that covered the track and missed it
+        self.hits = np.zeros(0, dtype=int)
+        self.conf = np.zeros(0)
+        self.cls = np.zeros(0, dtype=int)
+        self.time = None
+        self.next_id = 1
+
+    def __len__(self):
+        return len(self.ids)
+
+    # =======================
+    # LIFECYCLE
+    # =======================
+    def _keep(self, mask):
+        self.ids, self.x, self.P = self.ids[mask], self.x[mask], self.P[mask]
+        self.last_update, self.last_missed = self.last_update[mask], self.last_missed[mask]
+        self.hits = self.hits[mask]
+        self.conf, self.cls = self.conf[mask], self.cls[mask]
+
+    def _expire(self, now):
+        if len(self):
+            self._keep((self.last_missed - self.last_update <= self.max_age)
+                       & (now - self.last_update <= self.max_coast))
+
+    def predict(self, now):
+        """Advance all tracks to `now` and drop the expired ones (see top of file)."""
+        if self.time is not None and now > self.time and len(self):
+            self.x, self.P = kf_predict(self.x, self.P, now - self.time, self.accel_var)
+        self.time = now if self.time is None else max(self.time, now)
+        self._expire(self.time)
+
+    def update(self, detections, now, region=None, frame_shape=None):
+        """
+        Associate (N, 6) detections [x1, y1, x2, y2, conf, cls] with the tracks.
+        `region` (x0, y0, x1, y1) is the area the detector ran on (None = full
+        frame); unmatched tracks centered outside it are not counted as missed,
+        unless they are outside `frame_shape` altogether.
+        """
+        self.predict(now)
+        dets = np.asarray(detections, dtype=np.float64).reshape(-1, 6)
+
+        rows, cols = _assign(iou_matrix(z_to_box(self.x), dets[:, :4]), self.iou_threshold)
+        if len(rows):
+            x, P = kf_update(self.x[rows], self.P[rows], box_to_z(dets[cols, :4]), self.meas_var)
+            self.x[rows], self.P[rows] = x, P
+            self.last_update[rows] = now
+            self.hits[rows] += 1
+            self.conf[rows] = dets[cols, 4]
+            self.cls[rows] = dets[cols, 5].astype(int)
+
+        missed = np.ones(len(self), dtype=bool)
+        missed[rows] = False
+        if region is not None and len(self):
+            cx, cy = self.x[:, 0], self.x[:, 1]
+            searched = (cx >= region[0]) & (cx < region[2]) & (cy >= region[1]) & (cy < region[3])
+            if frame_shape is not None:
+                rows_px, cols_px = frame_shape[:2]
+                searched |= (cx < 0) | (cx >= cols_px) | (cy < 0) | (cy >= rows_px)  # Left the view
+            missed &= searched
+        self.last_missed[missed] = now
+        self._expire(now)
+
+        # Unmatched detections start new tracks, most confident first
+        new = np.setdiff1d(np.arange(len(dets)), cols)
+        new = new[np.argsort(-dets[new, 4])][:max(0, self.max_tracks - len(self))]
+        if len(new):
+            x, P = kf_init(box_to_z(dets[new, :4]))
+            self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + len(new))])
+            self.next_id += len(new)
+            self.x = np.concatenate([self.x, x])
+            self.P = np.concatenate([self.P, P])
+            self.last_update = np.concatenate([self.last_update, np.full(len(new), now)])
+            self.last_missed = np.concatenate([self.last_missed, np.full(len(new), now)])
+            self.hits = np.concatenate([self.hits, np.ones(len(new), dtype=int)])
+            self.conf = np.concatenate([self.conf, dets[new, 4]])
+            self.cls = np.concatenate([self.cls, dets[new, 5].astype(int)])
+
+    # =======================
+    # QUERIES
+    # =======================
+    @property
+    def confirmed(self):
+        return self.hits >= self.min_hits
+
+    def tracks(self):
+        """[(track_id, (x1, y1, x2, y2), conf, cls)] for confirmed tracks."""
+        mask = self.confirmed
+        boxes = z_to_box(self.x[mask]).astype(int) if mask.any() else []
+        return [
+            (int(i), tuple(int(v) for v in b), float(c), int(k))
+            for i, b, c, k in zip(self.ids[mask], boxes, self.conf[mask], self.cls[mask])
+        ]
+
+    def _index(self, track_id):
+        hit = np.flatnonzero(self.ids == track_id)
+        return int(hit[0]) if len(hit) else None
+
+    def box(self, track_id):
+        i = self._index(track_id)
+        return None if i is None else tuple(int(v) for v in z_to_box(self.x[i:i + 1])[0])
+
+    def confidence(self, track_id):
+        i = self._index(track_id)
+        return 0.0 if i is None else float(self.conf[i])
+
+    def velocity(self, track_id):
+        """(vx, vy) of the box center in px/s."""
+        i = self._index(track_id)
+        return (0.0, 0.0) if i is None else (float(self.x[i, 4]), float(self.x[i, 5]))
+
+    def speed(self, track_id):
+        return float(np.hypot(*self.velocity(track_id)))
+
+    def select_target(self, policy="lock", frame_shape=(480, 640), locked_id=None):
+        """
+        Pick the track to follow -> (track_id, box) or (None, None).
+          lock:    keep `locked_id` while it lives, else fall back to "center"
+          largest: biggest box area
+          center:  closest to the image center
+        """
+        mask = self.confirmed
+        if not mask.any():
+            return None, None
+        if policy == "lock" and locked_id is not None:
+            i = self._index(locked_id)
+            if i is not None and mask[i]:
+                return locked_id, self.box(locked_id)
+
+        ids, z = self.ids[mask], self.x[mask, :4]
+        if policy == "largest":
+            best = int(np.argmax(z[:, 2] * z[:, 3]))
+        else:
+            rows, cols = frame_shape[:2]
+            best = int(np.argmin(np.hypot(z[:, 0] - cols / 2, z[:, 1] - rows / 2)))
+        track_id = int(ids[best])
+        return track_id, self.box(track_id)
@@ -0,0 +1,70 @@
+# ==========================================
+# REGION-OF-INTEREST INFERENCE
+# ==========================================
+# Once a target is locked, YOLO does not need the whole 640x480 frame:
+# a padded square around the tracked box is cropped instead, so at the same
+# imgsz the bottle covers far more input pixels and the background costs
+# nothing. The full frame is still searched
+#   - when nothing is locked,
+#   - after a detector run on the crop found nothing (target left the window),
+#   - every `full_frame_interval` seconds, to pick up new candidates.
+
+import numpy as np
+
+
+class RoiPlanner:
+    def __init__(self, pad=1.0, min_size=192, full_frame_interval=1.0):
+        self.pad = pad                          # Margin around the box, in box sizes per side
+        self.min_size = min_size                # Smallest crop side in pixels (~ model imgsz)
+        self.full_frame_interval = full_frame_interval
+        self.last_full = None
+        self.force_full = True
+        self.full = True                        # Whether the last plan() was the full frame
+
+        # Counters
+        self.roi_runs = 0
+        self.full_runs = 0
+
+    def plan(self, frame_shape, box, now):
+        """
+        Region (x0, y0, x1, y1) to run the detector on for this frame.
+        `box` is the locked target (x1, y1, x2, y2) or None.
+        """
+        rows, cols = frame_shape[:2]
+        due = self.last_full is None or now - self.last_full >= self.full_frame_interval
+        if box is None or self.force_full or due:
+            self.last_full = now
+            self.force_full = False
+            self.full = True
+            self.full_runs += 1
+            return 0, 0, cols, rows
+
+        x1, y1, x2, y2 = box
+        side = max(x2 - x1, y2 - y1) * (1 + 2 * self.pad)
+        side = int(min(max(side, self.min_size), cols, rows))
+        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+        x0 = int(np.clip(cx - side // 2, 0, cols - side))
+        y0 = int(np.clip(cy - side // 2, 0, rows - side))
+        self.full = False
+        self.roi_runs += 1
+        return x0, y0, x0 + side, y0 + side
+
+    @staticmethod
+    def crop(frame, region):
+        x0, y0, x1, y1 = region
+        return np.ascontiguousarray(frame[y0:y1, x0:x1])
+
+    def to_frame(self, detections, region):
+        """Shift (N, 6) detections from crop to frame coordinates. An empty
+        result on a crop makes the next plan() search the full frame."""
+        x0, y0 = region[:2]
+        if len(detections) == 0:
+            self.force_full = True
+            return detections
+        dets = detections.copy()
+        dets[:, [0, 2]] += x0
+        dets[:, [1, 3]] += y0
+        return dets
+
+    def stats(self):
+        return {"roi_runs": self.roi_runs, "roi_full_frame_runs": self.full_runs}
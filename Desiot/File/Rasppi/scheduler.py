@@ -0,0 +1,184 @@
+# ==========================================
+# ADAPTIVE INFERENCE SCHEDULER
+# ==========================================
+# Replaces the fixed SKIP_FRAMES modulo. For every captured frame it decides
+# whether the heavy detector should run, based on:
+#   1. What the robot is doing: a locked target (especially a fast one)
+#      gets frequent detections, IDLE gets few.
+#   2. The detector's measured cost: runs are spaced so the detector uses
+#      at most `cpu_budget` of one core.
+#   3. Frame latency: if processed frames take longer than `frame_budget`,
+#      the interval backs off until timings recover.
+#
+# Every frame gets a history entry keyed by its capture time: a decision,
+# or skip() when something else (busy worker, motion gate) kept the detector
+# from being asked. Timings are attributed to that entry, also when a
+# worker process reports the inference time frames later (inline=False).
+#
+# Decisions only depend on the timestamps and timings passed in, so a
+# recorded trace can be replayed offline:
+#   python scheduler.py trace.json
+
+import json
+import sys
+from collections import deque
+
+
+# Desired seconds between detector runs per robot state
+STATE_INTERVALS = {
+    "LOCKED": 0.15,
+    "SEARCH": 0.25,
+    "IDLE": 0.6,
+}
+
+
+class AdaptiveScheduler:
+    def __init__(self, cpu_budget=0.5, frame_budget=0.15, fast_speed=200.0,
+                 min_interval=0.0, max_interval=2.0, history=600, inline=True):
+        self.cpu_budget = cpu_budget      # Share of one core the detector may use
+        self.frame_budget = frame_budget  # Seconds per processed frame
+        self.fast_speed = fast_speed      # px/s; faster targets get detected every frame
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.inline = inline              # Detector runs inside the frame loop (False: worker process)
+
+        self.inference_ema = None
+        self.frame_ema = None
+        self.backoff = 1.0
+        self.last_run = None
+        self.interval = 0.0
+
+        self.runs = 0
+        self.skips = 0
+        self.gated = 0
+        self.history = deque(maxlen=history)  # Recent decisions, see save_trace()
+
+    # =======================
+    # TIMING FEEDBACK
+    # =======================
+    @staticmethod
+    def _ema(old, value, alpha=0.2):
+        return value if old is None else old + alpha * (value - old)
+
+    def _entry(self, t):
+        """History entry of the frame captured at `t` (latest entry if t is None)."""
+        if t is None:
+            return self.history[-1] if self.history else None
+        t = round(t, 4)
+        for entry in reversed(self.history):
+            if entry["t"] <= t:
+                return entry if entry["t"] == t else None
+        return None
+
+    def record_inference(self, seconds, t=None):
+        """Detector time of the frame captured at `t` (default: the latest decision)."""
+        self.inference_ema = self._ema(self.inference_ema, seconds)
+        entry = self._entry(t)
+        if entry is not None:
+            entry["inference"] = round(seconds, 5)
+
+    def record_frame(self, seconds, t=None):
+        """Loop time of the frame captured at `t`, including an inline detector run."""
+        self.frame_ema = self._ema(self.frame_ema, seconds)
+        entry = self._entry(t)
+        if entry is not None:
+            inference = entry.get("inference", 0.0) if self.inline else 0.0
+            entry["frame"] = round(seconds - inference, 5)
+        if self.frame_ema > self.frame_budget:
+            self.backoff = min(self.backoff * 1.25, 8.0)
+        else:
+            self.backoff = max(self.backoff * 0.95, 1.0)
+
+    # =======================
+    # DECISION
+    # =======================
+    def target_interval(self, state, target_speed=0.0):
+        if state == "LOCKED" and target_speed >= self.fast_speed:
+            desired = 0.0
+        else:
+            desired = STATE_INTERVALS.get(state, STATE_INTERVALS["IDLE"])
+
+        # Keep the detector's duty cycle within budget
+        cost_floor = (self.inference_ema or 0.0) / self.cpu_budget
+        interval = max(desired, cost_floor, self.min_interval) * self.backoff
+        return min(interval, self.max_interval)
+
+    def should_run(self, now, state, target_speed=0.0):
+        self.interval = self.target_interval(state, target_speed)
+        run = self.last_run is None or now - self.last_run >= self.interval
+        if run:
+            self.last_run = now
+            self.runs += 1
+        else:
+            self.skips += 1
+        self._append(now, state, target_speed, run=run, interval=round(self.interval, 4))
+        return run
+
+    def skip(self, now, state, target_speed=0.0, reason="gated"):
+        """Frame where the detector was not asked (e.g. worker busy, static scene)."""
+        self.gated += 1
+        self._append(now, state, target_speed, run=False, gated=reason)
+
+    def _append(self, now, state, target_speed, **fields):
+        entry = {"t": round(now, 4), "state": state, "speed": round(target_speed, 1), **fields}
+        if not self.inline:
+            entry["inline"] = False
+        self.history.append(entry)
+
+    def stats(self):
+        return {
+            "scheduler_runs": self.runs,
+            "scheduler_skips": self.skips,
+            "scheduler_gated": self.gated,
+            "scheduler_interval_seconds": round(self.interval, 4),
+            "scheduler_backoff": round(self.backoff, 3),
+        }
+
+    def save_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(list(self.history), f)
+
+
+# =======================
+# OFFLINE REPLAY
+# =======================
+def replay(trace, scheduler=None):
+    """
+    Feed a recorded trace (e.g. from save_trace()) through a scheduler.
+    Each entry: {"t": capture time, "state": ..., "speed": px/s,
+                 "inference": seconds (used if the detector runs),
+                 "frame": seconds of processing without the detector,
+                 "gated": reason, when the detector could not be asked,
+                 "inline": False, when the detector ran in a worker process}
+    Returns the scheduler, whose counters/history describe the run.
+    """
+    if scheduler is None:
+        scheduler = AdaptiveScheduler(inline=not trace or trace[0].get("inline", True))
+    for entry in trace:
+        t, state, speed = entry["t"], entry.get("state", "IDLE"), entry.get("speed", 0.0)
+        if "gated" in entry:
+            scheduler.skip(t, state, speed, entry["gated"])
+            ran = False
+        else:
+            ran = scheduler.should_run(t, state, speed)
+        inference = 0.0
+        if ran:
+            # Frames that did not run the detector in the recording reuse the running estimate
+            inference = entry.get("inference", scheduler.inference_ema or 0.0)
+            scheduler.record_inference(inference, t)
+        if "frame" in entry:
+            # Only an inline detector run adds to the frame's own loop time
+            scheduler.record_frame(entry["frame"] + (inference if scheduler.inline else 0.0), t)
+    return scheduler
+
+
+if __name__ == "__main__":
+    with open(sys.argv[1]) as f:
+        trace = json.load(f)
+    result = replay(trace)
+    duration = trace[-1]["t"] - trace[0]["t"] if len(trace) > 1 else 0.0
+    print(json.dumps({
+        **result.stats(),
+        "frames": len(trace),
+        "detections_per_second": round(result.runs / duration, 2) if duration else None,
+    }, indent=2))
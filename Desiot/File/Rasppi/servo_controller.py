@@ -0,0 +1,268 @@
+# ==========================================
+# PAN/TILT SERVO CONTROLLER
+# ==========================================
+# Replaces the fixed-step tracking ("if obj_x < center - margin: curr_x += step").
+# Each axis is a PID on the angular error of the target, driven by capture
+# timestamps (dt in seconds), so the head converges at the same speed no
+# matter how many frames per second the vision loop manages.
+#
+#   - The pixel error is converted to degrees with the camera field of view.
+#   - The D term uses the tracker's velocity estimate when available
+#     instead of a noisy finite difference of the error.
+#   - Output is rate limited (deg/s) and clamped to the servo range.
+#   - command() returns a UART message only when the integer angles the
+#     ESP32 receives (it parses them with toInt()) actually change.
+#
+# Offline tuning against a simulated servo + camera:
+#   python servo_controller.py --kp 4 --kd 0.1
+
+import argparse
+import json
+import math
+
+
+# Raspberry Pi Camera v2 field of view (degrees)
+DEFAULT_FOV = (62.2, 48.8)
+
+
+class AxisPID:
+    def __init__(self, kp=4.0, ki=0.0, kd=0.1, min_angle=0.0, max_angle=180.0,
+                 max_rate=240.0, deadband=1.0, integral_limit=20.0, max_step_gain=0.5,
+                 sign=1.0, home=90.0):
+        self.kp = kp                  # deg/s of motion per degree of error
+        self.ki = ki
+        self.kd = kd
+        self.min_angle = min_angle
+        self.max_angle = max_angle
+        self.max_rate = max_rate      # deg/s the command may move
+        self.deadband = deadband      # Degrees of error treated as centered
+        self.integral_limit = integral_limit
+        # Max share of the error corrected in one update. With a frame of
+        # latency in the loop, kp * dt above ~0.5 overshoots, so slow frames
+        # must not take proportionally bigger steps.
+        self.max_step_gain = max_step_gain
+        self.sign = sign              # +1 / -1 depending on how the servo is mounted
+        self.home = home
+        self.reset()
+
+    def reset(self, angle=None):
+        self.angle = self.home if angle is None else angle
+        self.integral = 0.0
+        self.prev_error = None
+
+    def update(self, error, dt, error_rate=None):
+        """
+        error: target offset in degrees (positive = right/down in the image).
+        error_rate: deg/s from the tracker, else differentiated from `error`.
+        Returns the new commanded angle.
+        """
+        if dt <= 0:
+            return self.angle
+        if abs(error) < self.deadband:
+            error = 0.0
+
+        if error_rate is None:
+            error_rate = 0.0 if self.prev_error is None else (error - self.prev_error) / dt
+        self.prev_error = error
+
+        # Integrate only while the output is not saturated (anti-windup)
+        saturated = self.angle <= self.min_angle or self.angle >= self.max_angle
+        if not saturated:
+            self.integral += error * dt
+            self.integral = max(-self.integral_limit, min(self.integral_limit, self.integral))
+
+        move = min(self.kp * dt, self.max_step_gain) * error
+        move += (self.ki * self.integral + self.kd * error_rate) * dt
+        limit = self.max_rate * dt
+        self.angle += self.sign * max(-limit, min(limit, move))
+        self.angle = max(self.min_angle, min(self.max_angle, self.angle))
+        return self.angle
+
+
+class PanTiltController:
+    def __init__(self, frame_size=(640, 480), fov=DEFAULT_FOV, pan=None, tilt=None,
+                 min_resend=1.0, max_dt=0.5):
+        self.frame_size = frame_size
+        self.fov = fov
+        # Object left of center -> pan angle up; object below center -> tilt angle up
+        self.pan = pan or AxisPID(sign=-1.0)
+        self.tilt = tilt or AxisPID(sign=1.0, min_angle=70.0, max_angle=120.0)
+        self.min_resend = min_resend  # Seconds; repeat an unchanged command as keep-alive
+        self.max_dt = max_dt          # Seconds; longer gaps (target reacquired) count as one frame
+        self.time = None
+        self.last_sent = None
+        self.last_sent_time = None
+        self.messages = 0
+
+    @property
+    def deg_per_px(self):
+        return self.fov[0] / self.frame_size[0], self.fov[1] / self.frame_size[1]
+
+    @property
+    def angles(self):
+        return int(round(self.pan.angle)), int(round(self.tilt.angle))
+
+    def reset(self, pan=None, tilt=None):
+        self.pan.reset(pan)
+        self.tilt.reset(tilt)
+        self.time = None
+
+    def set_angles(self, pan=None, tilt=None):
+        """Drive the head directly (search sweep, home); keeps PID state consistent."""
+        if pan is not None:
+            self.pan.reset(pan)
+        if tilt is not None:
+            self.tilt.reset(tilt)
+
+    def update(self, target, now, velocity=None):
+        """
+        target: (x, y) pixel center of the tracked box.
+        velocity: (vx, vy) px/s from the Kalman tracker, optional.
+        now: capture timestamp of the frame in seconds.
+        """
+        dt = 0.0 if self.time is None else min(now - self.time, self.max_dt)
+        self.time = now
+        kx, ky = self.deg_per_px
+        err_x = (target[0] - self.frame_size[0] / 2) * kx
+        err_y = (target[1] - self.frame_size[1] / 2) * ky
+        rate_x = rate_y = None
+        if velocity is not None:
+            rate_x, rate_y = velocity[0] * kx, velocity[1] * ky
+        self.pan.update(err_x, dt, rate_x)
+        self.tilt.update(err_y, dt, rate_y)
+        return self.angles
+
+    def command(self, beep=0, now=None):
+        """UART message "pan,tilt,beep\\n" if it differs from the last one sent, else None."""
+        msg = (*self.angles, int(beep))
+        resend = (now is not None and self.last_sent_time is not None
+                  and now - self.last_sent_time >= self.min_resend)
+        if msg == self.last_sent and not resend:
+            return None
+        self.last_sent = msg
+        self.last_sent_time = now
+        self.messages += 1
+        return "{},{},{}\n".format(*msg)
+
+
+# =======================
+# SIMULATED PLANT
+# =======================
+class StepController:
+    """The old fixed-step logic, for comparison in simulate()."""
+
+    def __init__(self, step=2.0, margin=60, frame_size=(640, 480)):
+        self.step, self.margin, self.frame_size = step, margin, frame_size
+        self.pan, self.tilt = 90.0, 90.0
+        self.messages = 0
+
+    def update(self, target, now, velocity=None):
+        cx, cy = self.frame_size[0] // 2, self.frame_size[1] // 2
+        if target[0] < cx - self.margin: self.pan += self.step
+        elif target[0] > cx + self.margin: self.pan -= self.step
+        if target[1] < cy - self.margin: self.tilt -= self.step
+        elif target[1] > cy + self.margin: self.tilt += self.step
+        self.pan = max(0, min(180, self.pan))
+        self.tilt = max(70, min(120, self.tilt))
+        return self.pan, self.tilt
+
+    def command(self, beep=0, now=None):
+        # The old loop sent every frame
+        self.messages += 1
+        return f"{self.pan},{self.tilt},{beep}\n"
+
+
+class SimulatedHead:
+    """
+    Servo + camera model. Servos follow the last command with a first-order
+    lag and a slew limit; the camera sees the target's world angle relative
+    to where the head points, delayed by `latency` frames.
+    """
+
+    def __init__(self, fov=DEFAULT_FOV, frame_size=(640, 480), servo_tau=0.08,
+                 servo_speed=300.0, latency=1):
+        self.fov, self.frame_size = fov, frame_size
+        self.servo_tau = servo_tau        # Seconds
+        self.servo_speed = servo_speed    # deg/s (SG90 ~ 0.1s/60deg)
+        self.latency = latency
+        self.pan, self.tilt = 90.0, 90.0
+        self.cmd = (90.0, 90.0)
+        self._seen = []
+
+    def _follow(self, angle, cmd, dt):
+        delta = (cmd - angle) * (1 - math.exp(-dt / self.servo_tau))
+        limit = self.servo_speed * dt
+        return angle + max(-limit, min(limit, delta))
+
+    def step(self, dt, target_angles):
+        self.pan = self._follow(self.pan, self.cmd[0], dt)
+        self.tilt = self._follow(self.tilt, self.cmd[1], dt)
+        # World angles -> pixels (pan: target at higher angle appears left)
+        w, h = self.frame_size
+        x = w / 2 - (target_angles[0] - self.pan) * w / self.fov[0]
+        y = h / 2 + (target_angles[1] - self.tilt) * h / self.fov[1]
+        self._seen.append((x, y))
+        return self._seen[-1 - self.latency] if len(self._seen) > self.latency else self._seen[0]
+
+
+def simulate(controller, duration=3.0, fps=10.0, target=None, tolerance_px=20, **head_options):
+    """
+    Run `controller` against SimulatedHead. `target(t)` gives the world
+    (pan, tilt) of the object in degrees; default is a 25 degree step.
+    Returns frames/time until centered, overshoot and UART messages.
+    """
+    target = target or (lambda t: (115.0, 100.0))
+    head = SimulatedHead(**head_options)
+    dt = 1.0 / fps
+    centered_at = None
+    max_err = overshoot = 0.0
+    first_sign = None
+    frames = int(duration * fps)
+    for i in range(frames):
+        t = i * dt
+        px = head.step(dt, target(t))
+        cmd_angles = controller.update(px, t)
+        if controller.command(0, now=t) is not None:
+            head.cmd = cmd_angles
+        err = px[0] - head.frame_size[0] / 2
+        max_err = max(max_err, abs(err))
+        if first_sign is None and abs(err) > tolerance_px:
+            first_sign = math.copysign(1, err)
+        elif first_sign is not None and math.copysign(1, err) != first_sign:
+            overshoot = max(overshoot, abs(err))
+        centered = abs(err) <= tolerance_px and abs(px[1] - head.frame_size[1] / 2) <= tolerance_px
+        if centered and centered_at is None:
+            centered_at = i
+        elif not centered:
+            centered_at = None
+    return {
+        "frames_to_center": centered_at,
+        "seconds_to_center": None if centered_at is None else round(centered_at * dt, 3),
+        "overshoot_px": round(overshoot, 1),
+        "uart_messages": controller.messages,
+        "frames": frames,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune the pan/tilt PID against a simulated head")
+    parser.add_argument("--kp", type=float, default=4.0)
+    parser.add_argument("--ki", type=float, default=0.0)
+    parser.add_argument("--kd", type=float, default=0.1)
+    parser.add_argument("--max-rate", type=float, default=240.0)
+    parser.add_argument("--fps", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--latency", type=int, default=1, help="Frames between capture and command")
+    parser.add_argument("--step", type=float, default=2.0, help="Old fixed step, for comparison")
+    args = parser.parse_args()
+
+    gains = dict(kp=args.kp, ki=args.ki, kd=args.kd, max_rate=args.max_rate)
+    pid = PanTiltController(
+        pan=AxisPID(sign=-1.0, **gains),
+        tilt=AxisPID(sign=1.0, min_angle=70.0, max_angle=120.0, **gains),
+    )
+    sim = dict(duration=args.duration, fps=args.fps, latency=args.latency)
+    print(json.dumps({
+        "pid": simulate(pid, **sim),
+        "fixed_step": simulate(StepController(step=args.step), **sim),
+    }, indent=2))
@@ -0,0 +1,96 @@
+# ==========================================
+# STREAM HUB (Lazy MJPEG Encoding)
+# ==========================================
+# The vision loop only hands over its annotated frame (no copy, no encode).
+# A JPEG is produced the first time a /video_feed client asks for a given
+# frame sequence, and the same bytes are shared by every connected client.
+# With no browser attached nothing is encoded at all.
+
+import threading
+from contextlib import contextmanager
+
+import cv2
+
+from metrics import metrics
+
+
+class StreamHub:
+    """Latest-frame holder with demand-driven JPEG encoding."""
+
+    def __init__(self, jpeg_quality=95):
+        self.jpeg_quality = jpeg_quality
+        self._cond = threading.Condition()
+        self._encode_lock = threading.Lock()
+
+        self._frame = None
+        self._seq = 0
+        self._jpeg = None
+        self._jpeg_seq = 0
+        self._subscribers = 0
+
+        # Counters
+        self.frames_captured = 0
+        self.frames_encoded = 0
+        self.frames_served = 0
+
+    # =======================
+    # PRODUCER SIDE
+    # =======================
+    def publish(self, frame_bgr):
+        """Store a reference to the newest frame. The caller must not modify it afterwards."""
+        with self._cond:
+            self._frame = frame_bgr
+            self._seq += 1
+            self.frames_captured += 1
+            self._cond.notify_all()
+
+    @property
+    def has_subscribers(self):
+        return self._subscribers > 0
+
+    # =======================
+    # CONSUMER SIDE
+    # =======================
+    @contextmanager
+    def subscribe(self):
+        """Register a stream client for the lifetime of the `with` block."""
+        with self._cond:
+            self._subscribers += 1
+        try:
+            yield self
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+
+    def wait_jpeg(self, last_seq, timeout=1.0):
+        """
+        Block until a frame newer than `last_seq` is published.
+        Return (seq, jpeg_bytes), or (last_seq, None) on timeout.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq != last_seq and self._frame is not None, timeout):
+                return last_seq, None
+            seq = self._seq
+            frame = self._frame
+
+        with self._encode_lock:
+            # Another client may already have encoded this sequence (or a newer one);
+            # never overwrite a newer cached JPEG with an older frame
+            if seq > self._jpeg_seq:
+                with metrics.span("encode"):
+                    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                if not ret:
+                    return seq, None
+                self._jpeg = buffer.tobytes()
+                self._jpeg_seq = seq
+                self.frames_encoded += 1
+            self.frames_served += 1
+            return self._jpeg_seq, self._jpeg
+
+    def stats(self):
+        return {
+            "subscribers": self._subscribers,
+            "frames_captured": self.frames_captured,
+            "frames_encoded": self.frames_encoded,
+            "frames_served": self.frames_served,
+        }
@@ -1,18 +1,23 @@
 import cv2
 
-# Pakai V4L2 backend dan device /dev/video0
-cap = cv2.VideoCapture(0, cv2.CAP_V4L2)
+from frame_source import V4L2Source
 
-print("Opened:", cap.isOpened())
-if not cap.isOpened():
+# Pakai V4L2 backend dan device /dev/video0
+try:
+    cam = V4L2Source(0)
+except IOError as e:
+    print("Opened: False", e)
     exit(1)
 
-ret, frame = cap.read()
-print("Got frame:", ret)
+print("Opened: True")
 
-if ret:
+try:
+    frame = cam.capture_array()  # RGB
+    print("Got frame:", True)
     out_name = "frame_0.jpg"
-    cv2.imwrite(out_name, frame)
+    cv2.imwrite(out_name, cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
     print("Saved:", out_name)
+except EOFError:
+    print("Got frame:", False)
 
-cap.release()
+cam.stop()
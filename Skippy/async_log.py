@@ -0,0 +1,120 @@
+"""
+Logging yang tidak memblokir event loop: pemanggil hanya memasukkan record
+ke antrian, thread QueueListener di belakang yang memformat dan menulis.
+
+  from async_log import get_logger
+  log = get_logger("skippy.server")
+  log.info("Klien terhubung", client="127.0.0.1:5123")
+  log.sampled("ws_rx", 1.0, "Menerima dari Web", client=addr, command="B90")
+
+- Level dari env LOG_LEVEL (DEBUG/INFO/WARNING/ERROR, default INFO) untuk
+  logger dari get_logger(); websockets/aiohttp hanya WARNING ke atas.
+- Field ditulis sebagai key=value, atau JSON per baris dengan LOG_FORMAT=json.
+- sampled(): paling banyak satu baris per `interval` detik per key, untuk
+  event per pesan; jumlah yang dilewati ikut dicatat (skipped=N).
+- Antrian terbatas: bila penuh (terminal lambat), record dibuang.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+QUEUE_SIZE = 10000
+
+_listener = None
+_level = logging.INFO
+
+
+class StructuredFormatter(logging.Formatter):
+    def __init__(self, as_json=False):
+        super().__init__("%(asctime)s.%(msecs)03d %(levelname)-7s %(name)s  %(message)s", "%H:%M:%S")
+        self.as_json = as_json
+
+    def format(self, record):
+        fields = getattr(record, "fields", None) or {}
+        if self.as_json:
+            return json.dumps({"time": record.created, "level": record.levelname, "logger": record.name,
+                               "msg": record.getMessage(), **fields}, ensure_ascii=False, default=str)
+        line = super().format(record)
+        if fields:
+            line += "  " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Tidak memformat di thread pemanggil dan tidak pernah menunggu antrian."""
+
+    def prepare(self, record):
+        return record  # Format dikerjakan oleh thread listener
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+class EventLogger:
+    """logging.Logger dengan field terstruktur: log.info("pesan", client=..., latency_ms=...)."""
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.samples = {}     # key -> [waktu baris terakhir, jumlah yang dilewati]
+
+    def log(self, level, msg, **fields):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, msg, extra={"fields": fields})
+
+    def info(self, msg, **fields):
+        self.log(logging.INFO, msg, **fields)
+
+    def warning(self, msg, **fields):
+        self.log(logging.WARNING, msg, **fields)
+
+    def error(self, msg, **fields):
+        self.log(logging.ERROR, msg, **fields)
+
+    def sampled(self, key, interval, msg, level=logging.INFO, **fields):
+        """Paling banyak satu baris per `interval` detik untuk `key`."""
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        sample = self.samples.get(key)
+        if sample is not None and now - sample[0] < interval:
+            sample[1] += 1
+            return
+        skipped = sample[1] if sample is not None else 0
+        self.samples[key] = [now, 0]
+        if skipped:
+            fields["skipped"] = skipped
+        self.log(level, msg, **fields)
+
+
+def setup():
+    """Pasang QueueHandler di root logger dan jalankan listener (sekali saja)."""
+    global _listener, _level
+    if _listener is not None:
+        return
+    _level = os.environ.get("LOG_LEVEL", "INFO").upper()
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(StructuredFormatter(os.environ.get("LOG_FORMAT", "").lower() == "json"))
+    log_queue = queue.Queue(QUEUE_SIZE)
+
+    root = logging.getLogger()
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(logging.WARNING)
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+    atexit.register(_listener.stop)  # Tulis sisa antrian saat keluar
+
+
+def get_logger(name):
+    setup()
+    logger = logging.getLogger(name)
+    logger.setLevel(_level)
+    return EventLogger(logger)
@@ -0,0 +1,93 @@
+"""
+Benchmark latensi jembatan web -> ESP32 memakai ESP32 tiruan (fake_esp32.py).
+
+Membandingkan:
+  - "tanpa pool": koneksi TCP baru untuk setiap perintah (force_close)
+  - "pool":       create_session() dari forwarder.py (koneksi keep-alive dipakai ulang)
+dan mengukur CommandForwarder saat slider digeser cepat.
+
+  python bench_bridge.py --requests 200 --latency 5
+"""
+
+import argparse
+import asyncio
+import time
+
+import aiohttp
+
+from fake_esp32 import FakeEsp32
+from forwarder import CommandForwarder, create_session
+
+
+def summarize(name, latencies, elapsed):
+    latencies = sorted(latencies)
+    n = len(latencies)
+    print(f"{name:<14} n={n:<5} p50={latencies[n // 2] * 1000:7.2f} ms  "
+          f"p95={latencies[int(n * 0.95)] * 1000:7.2f} ms  max={latencies[-1] * 1000:7.2f} ms  "
+          f"({n / elapsed:6.0f} req/s)")
+
+
+async def run_direct(session, base_url, count, concurrency):
+    """Kirim `count` perintah /move, `concurrency` sekaligus (satu per servo)."""
+    latencies = []
+
+    async def client(servo):
+        for i in range(count // concurrency):
+            start = time.perf_counter()
+            async with session.get(f"{base_url}/move?servo={servo}&angle={i % 180}") as response:
+                await response.read()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(servo) for servo in "BSEG"[:concurrency]))
+    return latencies, time.perf_counter() - start
+
+
+async def run_forwarder(session, address, count, rate):
+    """Geser slider B dengan `rate` pesan/detik lewat CommandForwarder."""
+    forwarder = CommandForwarder(session, address).start()
+    for i in range(count):
+        forwarder.set_angle("B", str(i % 180))
+        await asyncio.sleep(1.0 / rate)
+    while forwarder.queue_depth or not forwarder.idle["B"].is_set():
+        await asyncio.sleep(0.01)
+    await forwarder.stop()
+    return forwarder.stats()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark jembatan Skippy")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=5, help="latensi ESP32 tiruan (ms)")
+    parser.add_argument("--concurrency", type=int, default=4, choices=range(1, 5))
+    parser.add_argument("--rate", type=float, default=200, help="pesan slider per detik")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+
+    fake = FakeEsp32(latency=args.latency / 1000)
+    runner = await fake.start(port=args.port)
+    address = f"127.0.0.1:{args.port}"
+    base_url = f"http://{address}"
+    print(f"ESP32 tiruan: latensi {args.latency} ms, {args.requests} perintah, {args.concurrency} paralel\n")
+
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(force_close=True)) as session:
+            before = len(fake.connections)
+            latencies, elapsed = await run_direct(session, base_url, args.requests, args.concurrency)
+            summarize("tanpa pool", latencies, elapsed)
+            print(f"{'':<14} koneksi TCP: {len(fake.connections) - before}")
+
+        async with create_session() as session:
+            before = len(fake.connections)
+            latencies, elapsed = await run_direct(session, base_url, args.requests, args.concurrency)
+            summarize("pool", latencies, elapsed)
+            print(f"{'':<14} koneksi TCP: {len(fake.connections) - before}")
+
+            print(f"\nForwarder, slider B {args.rate:.0f} pesan/detik:")
+            print(await run_forwarder(session, address, args.requests, args.rate))
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""
+Benchmark format pesan WebSocket: teks ("B90,") vs biner (skippy.bin.v1).
+
+1. parse: berapa pesan per detik bisa diurai protocol.parse()
+2. websocket: pesan per detik dari klien ke server lokal (kirim + terima + parse)
+
+  python bench_protocol.py --messages 100000
+"""
+
+import argparse
+import asyncio
+import time
+
+import websockets
+
+import protocol
+
+
+def sample_messages(count):
+    """Campuran realistis: kebanyakan gerak satu servo, sesekali pose."""
+    text, binary = [], []
+    for i in range(count):
+        angle = i % 181
+        if i % 10 == 0:
+            pose = {"B": angle, "S": 180 - angle, "E": 90, "G": angle // 2}
+            text.append("".join(f"{servo}{a}," for servo, a in pose.items()))
+            binary.append(protocol.encode_pose(pose))
+        else:
+            servo = "BSEG"[i % 4]
+            text.append(f"{servo}{angle},")
+            binary.append(protocol.encode_move(servo, angle))
+    return {"text": text, "binary": binary}
+
+
+def bench_parse(messages):
+    start = time.perf_counter()
+    for message in messages:
+        protocol.parse(message)
+    return len(messages) / (time.perf_counter() - start)
+
+
+async def bench_websocket(messages, subprotocol, port):
+    done = asyncio.Event()
+    received = 0
+
+    async def handler(websocket):
+        nonlocal received
+        async for message in websocket:
+            protocol.parse(message)
+            received += 1
+            if received == len(messages):
+                done.set()
+
+    async with websockets.serve(handler, "localhost", port,
+                                select_subprotocol=protocol.select_subprotocol):
+        async with websockets.connect(f"ws://localhost:{port}", subprotocols=[subprotocol]) as ws:
+            start = time.perf_counter()
+            for message in messages:
+                await ws.send(message)
+            await done.wait()
+            return len(messages) / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark protokol WebSocket Skippy")
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    samples = sample_messages(args.messages)
+    print(f"{args.messages} pesan (90% gerak satu servo, 10% pose)\n")
+    print(f"{'format':<8} {'byte/pesan':>10} {'parse/s':>12} {'websocket/s':>12}")
+    for name, subprotocol in (("text", protocol.TEXT), ("binary", protocol.BINARY)):
+        messages = samples[name]
+        size = sum(len(m) for m in messages) / len(messages)
+        parse_rate = bench_parse(messages)
+        ws_rate = await bench_websocket(messages, subprotocol, args.port)
+        print(f"{name:<8} {size:>10.1f} {parse_rate:>12,.0f} {ws_rate:>12,.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,179 @@
+"""
+Banyak browser sekaligus: satu pengendali, sisanya penonton.
+
+- ClientHub menyimpan keadaan lengan yang sah (sudut yang sudah diterima
+  ESP32, lihat forwarder.applied) dan menyiarkannya ke semua klien.
+  Pesan ACK diserialisasi sekali per format (teks/biner), lalu dibagikan.
+- Tiap klien menyimpan paling banyak satu pesan tertunda per jenis (ACK,
+  LOCK, ESP32); pesan baru menggantikan yang lama sejenis. Klien yang lambat
+  hanya melewatkan ACK lama, tidak pernah kehilangan status kunci/ESP32
+  terbaru, dan tidak memperlambat klien lain atau event loop.
+- Kunci pengendali: klien pertama yang menggerakkan lengan saat kunci
+  bebas menjadi pengendali. Kunci lepas bila pengendali mengirim UNLOCK,
+  terputus, atau diam lebih dari `control_timeout` detik. Perintah dari
+  klien lain ditolak dan klien itu diberi tahu ("LOCK:other,").
+"""
+
+import asyncio
+import time
+
+import websockets
+
+import protocol
+
+LOCK_YOU = "LOCK:you,"
+LOCK_OTHER = "LOCK:other,"
+LOCK_FREE = "LOCK:free,"
+
+
+class Client:
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.binary = websocket.subprotocol == protocol.BINARY
+        self.pending = {}                   # Jenis ("ACK"/"LOCK"/"ESP32") -> pesan terbaru yang belum terkirim
+        self.ready = asyncio.Event()
+        self.dropped = 0
+        self.task = asyncio.create_task(self._sender())
+
+    def push(self, message):
+        """Tidak pernah menunggu: pesan menggantikan pesan sejenis yang belum terkirim."""
+        kind = "ACK" if isinstance(message, bytes) else message.split(":", 1)[0]
+        if kind in self.pending:
+            self.dropped += 1
+        self.pending[kind] = message
+        self.ready.set()
+
+    async def _sender(self):
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+                while self.pending:
+                    await self.websocket.send(self.pending.pop(next(iter(self.pending))))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    def close(self):
+        self.task.cancel()
+
+
+class ClientHub:
+    def __init__(self, forwarder, control_timeout=10.0, interval=0.05):
+        self.forwarder = forwarder
+        self.control_timeout = control_timeout
+        self.interval = interval            # Jeda minimum antar siaran ACK
+        self.clients = {}                   # websocket -> Client
+        self.controller = None
+        self.last_control = 0.0
+        self.esp32_status = None            # "ESP32:online," / "ESP32:offline,"
+        self.task = None
+
+        # Statistik
+        self.broadcasts = 0
+        self.rejected = 0
+
+    def start(self):
+        self.task = asyncio.create_task(self._broadcaster())
+        return self
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+        for client in self.clients.values():
+            client.close()
+
+    # =======================
+    # KONEKSI
+    # =======================
+    def join(self, websocket):
+        client = Client(websocket)
+        self.clients[websocket] = client
+        # Klien baru langsung menerima keadaan lengan dan status kunci
+        if self.forwarder.applied:
+            client.push(protocol.encode_ack(self.forwarder.applied, client.binary))
+        client.push(self._lock_message(client))
+        if self.esp32_status:
+            client.push(self.esp32_status)
+        return client
+
+    def leave(self, websocket):
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return
+        client.close()
+        if self.controller is client:
+            self._set_controller(None)
+
+    # =======================
+    # KUNCI PENGENDALI
+    # =======================
+    def _lock_message(self, client):
+        if self.controller is None:
+            return LOCK_FREE
+        return LOCK_YOU if self.controller is client else LOCK_OTHER
+
+    def _set_controller(self, client):
+        self.controller = client
+        self.last_control = time.monotonic()
+        for other in self.clients.values():
+            other.push(self._lock_message(other))
+
+    def may_control(self, client):
+        """True bila klien boleh menggerakkan lengan (mengambil kunci bila bebas/kedaluwarsa)."""
+        now = time.monotonic()
+        if self.controller is not None and self.controller is not client \
+                and now - self.last_control > self.control_timeout:
+            self._set_controller(None)
+        if self.controller is None:
+            self._set_controller(client)
+        if self.controller is client:
+            self.last_control = now
+            return True
+        self.rejected += 1
+        client.push(LOCK_OTHER)
+        return False
+
+    def handle(self, client, action):
+        """LOCK / UNLOCK dari web. True bila tertangani."""
+        if action == "LOCK":
+            self.may_control(client)
+        elif action == "UNLOCK":
+            if self.controller is client:
+                self._set_controller(None)
+        else:
+            return False
+        return True
+
+    # =======================
+    # SIARAN KEADAAN LENGAN & ESP32
+    # =======================
+    def set_esp32_online(self, online):
+        """Listener health.CircuitBreaker: status ESP32 ke semua klien."""
+        self.esp32_status = "ESP32:online," if online else "ESP32:offline,"
+        for client in self.clients.values():
+            client.push(self.esp32_status)
+
+    async def _broadcaster(self):
+        event = self.forwarder.subscribe()
+        try:
+            while True:
+                await event.wait()
+                event.clear()
+                encoded = {}                # Satu serialisasi per format untuk semua klien
+                for client in self.clients.values():
+                    if client.binary not in encoded:
+                        encoded[client.binary] = protocol.encode_ack(self.forwarder.applied, client.binary)
+                    client.push(encoded[client.binary])
+                self.broadcasts += 1
+                await asyncio.sleep(self.interval)
+        finally:
+            self.forwarder.unsubscribe(event)
+
+    def stats(self):
+        return {
+            "clients": len(self.clients),
+            "controller": self.controller.websocket.remote_address if self.controller else None,
+            "broadcasts": self.broadcasts,
+            "rejected": self.rejected,
+            "dropped": sum(client.dropped for client in self.clients.values()),
+        }
@@ -0,0 +1,116 @@
+"""
+ESP32 tiruan untuk menguji server.py tanpa lengan robot.
+
+Meniru endpoint web server ESP32:
+  GET /move?servo=B&angle=90      -> "OK"
+  GET /pose?B=90&S=45&E=30&G=10   -> "OK"  (semua sendi dalam satu request)
+  GET /command?action=HOME        -> "OK"
+
+Latensi dan kegagalan bisa diatur untuk meniru WiFi yang buruk:
+  python fake_esp32.py --port 8080 --latency 20 --jitter 10 --fail 0.05
+lalu ubah ESP32_IP di server.py menjadi "127.0.0.1:8080".
+"""
+
+import argparse
+import asyncio
+import random
+
+from aiohttp import web
+
+SERVOS = "BSEG"
+
+
+class FakeEsp32:
+    def __init__(self, latency=0.02, jitter=0.0, fail_rate=0.0, pose=True, verbose=False):
+        self.latency = latency        # Detik sebelum menjawab (servo.write + WiFi)
+        self.jitter = jitter
+        self.fail_rate = fail_rate    # Peluang menjawab 500
+        self.pose = pose              # False: tiru firmware lama tanpa /pose
+        self.verbose = verbose
+        self.angles = {servo: 90 for servo in SERVOS}
+        self.actions = []
+        self.requests = 0
+        self.failures = 0
+        self.connections = set()      # Koneksi TCP yang pernah dipakai (cek keep-alive)
+
+    async def _respond(self, request):
+        self.requests += 1
+        self.connections.add(request.transport.get_extra_info("peername"))
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if random.random() < self.fail_rate:
+            self.failures += 1
+            return web.Response(status=500, text="FAIL")
+        return None
+
+    async def move(self, request):
+        servo = request.query.get("servo", "")
+        angle = request.query.get("angle", "")
+        if servo not in SERVOS or not angle.isdigit():
+            return web.Response(status=400, text="BAD REQUEST")
+        failure = await self._respond(request)
+        if failure:
+            return failure
+        self.angles[servo] = int(angle)
+        if self.verbose:
+            print(f"   [ESP32] {servo} -> {angle}")
+        return web.Response(text="OK")
+
+    async def move_pose(self, request):
+        angles = {servo: request.query[servo] for servo in SERVOS if servo in request.query}
+        if not angles or not all(angle.isdigit() for angle in angles.values()):
+            return web.Response(status=400, text="BAD REQUEST")
+        failure = await self._respond(request)
+        if failure:
+            return failure
+        self.angles.update({servo: int(angle) for servo, angle in angles.items()})
+        if self.verbose:
+            print(f"   [ESP32] pose {angles}")
+        return web.Response(text="OK")
+
+    async def command(self, request):
+        action = request.query.get("action", "")
+        failure = await self._respond(request)
+        if failure:
+            return failure
+        self.actions.append(action)
+        if action == "HOME":
+            self.angles = {servo: 90 for servo in SERVOS}
+        if self.verbose:
+            print(f"   [ESP32] command {action}")
+        return web.Response(text="OK")
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/move", self.move)
+        if self.pose:
+            app.router.add_get("/pose", self.move_pose)
+        app.router.add_get("/command", self.command)
+        return app
+
+    async def start(self, host="127.0.0.1", port=8080):
+        """Jalankan di event loop yang sedang aktif. Kembalikan runner (panggil cleanup() untuk berhenti)."""
+        runner = web.AppRunner(self.app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ESP32 tiruan untuk Skippy")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=20, help="ms")
+    parser.add_argument("--jitter", type=float, default=0, help="ms tambahan acak")
+    parser.add_argument("--fail", type=float, default=0.0, help="peluang gagal (0..1)")
+    parser.add_argument("--no-pose", action="store_true", help="tanpa endpoint /pose (firmware lama)")
+    args = parser.parse_args()
+
+    fake = FakeEsp32(args.latency / 1000, args.jitter / 1000, args.fail, not args.no_pose, verbose=True)
+    print(f"🤖 ESP32 tiruan di http://{args.host}:{args.port}")
+    web.run_app(fake.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
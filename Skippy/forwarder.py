@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import random
+import time
+
+import aiohttp
+
+from async_log import get_logger
+
+SERVOS = "BSEG"
+
+log = get_logger("skippy.forwarder")
+
+
+def create_session(pool_size=4, keepalive=30.0, connect_timeout=0.5, read_timeout=1.5):
+    """
+    Session HTTP ke ESP32 dengan koneksi keep-alive yang dipakai ulang.
+
+    - pool_size: maksimal koneksi paralel ke ESP32 (satu per servo sudah cukup;
+      lebih banyak hanya membebani web server ESP32).
+    - keepalive: berapa lama koneksi idle dibiarkan terbuka untuk dipakai lagi.
+    - connect_timeout pendek: ESP32 yang mati cepat ketahuan;
+      read_timeout lebih panjang: servo boleh butuh waktu untuk menjawab.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=pool_size,
+        limit_per_host=pool_size,
+        keepalive_timeout=keepalive,
+        ttl_dns_cache=300,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=connect_timeout + read_timeout,
+        sock_connect=connect_timeout,
+        sock_read=read_timeout,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+class CommandForwarder:
+    """
+    Meneruskan perintah dari web ke ESP32 tanpa membuat WebSocket menunggu.
+
+    - Sudut servo (B/S/E/G): satu "kotak surat" per servo yang hanya
+      menyimpan nilai terbaru. Nilai lama yang belum terkirim ditimpa
+      (coalescing), jadi lengan mengikuti posisi slider terakhir, bukan
+      mengulang semua posisi lama.
+    - Tiap servo punya task sendiri, jadi B, S, E, G dikirim paralel.
+    - Perintah lain (HOME, PLAY, REC_*) diantrikan berurutan dan baru
+      dikirim setelah semua sudut yang tertunda terkirim (REC_ADD harus
+      merekam posisi terbaru).
+    - Pose (beberapa sendi sekaligus) dikirim dalam satu request
+      /pose?B=..&S=..&E=..&G=.. -- satu round trip, bukan empat. Pose yang
+      belum terkirim juga ditimpa/digabung dengan yang terbaru. Bila ESP32
+      belum punya /pose (404), tiap sendi dikirim lewat /move seperti biasa.
+    - Sudut servo aman diulang (idempotent), jadi yang gagal dicoba lagi
+      hingga `retries` kali dengan jeda acak; perintah lain tidak
+      (PLAY/REC_ADD dua kali = dua aksi).
+    - Dengan `breaker` (health.CircuitBreaker), request saat ESP32 offline
+      langsung gagal tanpa menunggu timeout dan tanpa percobaan ulang.
+    Timeout diatur oleh session (lihat create_session).
+    """
+
+    def __init__(self, http_session, esp32_ip, retries=2, retry_delay=0.1, breaker=None):
+        self.http_session = http_session
+        self.esp32_ip = esp32_ip
+        self.breaker = breaker
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+        self.pending = {}                                   # servo -> (angle, waktu masuk)
+        self.angles = {servo: 90 for servo in SERVOS}       # Pose terakhir yang diperintahkan
+        self.applied = {}                                   # Sudut terakhir yang diterima ESP32 (OK)
+        self.subscribers = set()                            # Event per klien, diset saat `applied` berubah
+        self.wakeup = {servo: asyncio.Event() for servo in SERVOS}
+        self.idle = {servo: asyncio.Event() for servo in SERVOS}
+        for event in self.idle.values():
+            event.set()
+        self.commands = asyncio.Queue()
+        self.pose = {}                                      # servo -> angle, pose yang belum terkirim
+        self.pose_received_at = 0.0
+        self.pose_wakeup = asyncio.Event()
+        self.pose_idle = asyncio.Event()
+        self.pose_idle.set()
+        self.pose_supported = True
+        self.tasks = []
+
+        # Statistik
+        self.received = 0
+        self.coalesced = 0
+        self.forwarded = 0
+        self.failed = 0
+        self.retried = 0
+        self.poses = 0
+        self.latencies = []                                 # detik, sejak diterima sampai ESP32 menjawab
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self._servo_worker(servo)) for servo in SERVOS]
+        self.tasks.append(asyncio.create_task(self._pose_worker()))
+        self.tasks.append(asyncio.create_task(self._command_worker()))
+        self.tasks.append(asyncio.create_task(self.report()))
+        return self
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    # =======================
+    # MASUKAN DARI WEBSOCKET (tidak pernah menunggu HTTP)
+    # =======================
+    def set_angle(self, servo, angle):
+        self.received += 1
+        self.angles[servo] = int(angle)
+        if self.pose:
+            # Pose belum terkirim: ikutkan sudut ini agar urutannya tetap benar
+            if servo in self.pose:
+                self.coalesced += 1
+            self.pose[servo] = angle
+            return
+        if servo in self.pending:
+            self.coalesced += 1
+        self.pending[servo] = (angle, time.monotonic())
+        self.idle[servo].clear()
+        self.wakeup[servo].set()
+
+    def set_pose(self, angles):
+        """angles: {"B": 90, "S": 45, ...}; sendi yang tidak disebut tidak berubah."""
+        self.received += 1
+        if self.pose:
+            self.coalesced += 1
+        else:
+            self.pose_received_at = time.monotonic()
+        for servo in angles:
+            # Sudut tunggal yang belum terkirim sudah kalah baru dari pose ini
+            if self.pending.pop(servo, None) is not None:
+                self.coalesced += 1
+        self.pose.update(angles)
+        self.angles.update({servo: int(angle) for servo, angle in angles.items()})
+        self.pose_idle.clear()
+        self.pose_wakeup.set()
+
+    def command(self, action):
+        self.received += 1
+        if action == "HOME":
+            self.angles = {servo: 90 for servo in SERVOS}
+        self.commands.put_nowait((action, time.monotonic()))
+
+    @property
+    def queue_depth(self):
+        return len(self.pending) + bool(self.pose) + self.commands.qsize()
+
+    def subscribe(self):
+        """Event yang diset setiap kali ESP32 menerima sudut baru (untuk ACK ke web)."""
+        event = asyncio.Event()
+        self.subscribers.add(event)
+        return event
+
+    def unsubscribe(self, event):
+        self.subscribers.discard(event)
+
+    def _mark_applied(self, angles):
+        self.applied.update({servo: int(angle) for servo, angle in angles.items()})
+        for event in self.subscribers:
+            event.set()
+
+    # =======================
+    # PENGIRIM KE ESP32
+    # =======================
+    async def _get(self, url):
+        if self.breaker and not self.breaker.allow():
+            return None  # ESP32 offline: gagal cepat
+        try:
+            async with self.http_session.get(url) as response:
+                await response.read()  # Baca habis agar koneksi bisa kembali ke pool
+                if response.status != 200:
+                    log.sampled(f"status:{response.status}", 1.0, "<- Respon ESP32 tidak OK", logging.WARNING,
+                                status=response.status, url=url)
+                status = response.status
+        except Exception:
+            if self.breaker:
+                self.breaker.record_failure()
+            if not self.breaker or self.breaker.online:
+                log.sampled("connect", 1.0, "Gagal terhubung ke ESP32", logging.WARNING, esp32=self.esp32_ip)
+            return None
+        if self.breaker:
+            self.breaker.record_success()  # ESP32 menjawab (apa pun statusnya) = hidup
+        return status
+
+    def _superseded(self, servo):
+        if servo == "pose":
+            return bool(self.pose)
+        return servo in self.pending or bool(self.pose)
+
+    async def _send(self, url, received_at, servo=None, applied=None):
+        status = await self._get(url)
+        ok = status == 200
+        attempt = 0
+        # Hanya sudut servo/pose yang diulang, dan hanya bila belum ada yang lebih baru
+        while not ok and status != 404 and servo is not None and attempt < self.retries \
+                and not self._superseded(servo) and (self.breaker is None or self.breaker.online):
+            # Backoff eksponensial dengan jitter agar 4 servo tidak mencoba serentak
+            await asyncio.sleep(self.retry_delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+            attempt += 1
+            self.retried += 1
+            if self._superseded(servo):
+                break
+            status = await self._get(url)
+            ok = status == 200
+        if status == 404 and servo == "pose":
+            return status  # Bukan gagal: pose dikirim ulang lewat /move
+        if ok:
+            self.forwarded += 1
+            log.sampled("sent", 1.0, "-> ESP32 OK", logging.DEBUG, url=url,
+                        latency_ms=round((time.monotonic() - received_at) * 1000, 1))
+            if applied:
+                self._mark_applied(applied)
+            self._record_latency(time.monotonic() - received_at)
+        else:
+            self.failed += 1
+        return status
+
+    def _record_latency(self, seconds):
+        self.latencies.append(seconds)
+        if len(self.latencies) > 200:
+            del self.latencies[:100]
+
+    async def _servo_worker(self, servo):
+        while True:
+            await self.wakeup[servo].wait()
+            self.wakeup[servo].clear()
+            # Ambil nilai terbaru; nilai yang datang selama pengiriman menunggu putaran berikutnya
+            while servo in self.pending:
+                angle, received_at = self.pending.pop(servo)
+                await self.pose_idle.wait()  # Pose yang sedang dikirim lebih lama dari sudut ini
+                await self._send(f"http://{self.esp32_ip}/move?servo={servo}&angle={angle}", received_at, servo,
+                                 {servo: angle})
+            self.idle[servo].set()
+
+    async def _pose_worker(self):
+        while True:
+            await self.pose_wakeup.wait()
+            self.pose_wakeup.clear()
+            while self.pose:
+                pose, received_at = self.pose, self.pose_received_at
+                self.pose = {}
+                if self.pose_supported:
+                    query = "&".join(f"{servo}={angle}" for servo, angle in pose.items())
+                    status = await self._send(f"http://{self.esp32_ip}/pose?{query}", received_at, "pose", pose)
+                    if status != 404:
+                        self.poses += 1
+                        continue
+                    log.warning("ESP32 belum mendukung /pose, pakai /move per sendi.")
+                    self.pose_supported = False
+                await asyncio.gather(*(
+                    self._send(f"http://{self.esp32_ip}/move?servo={servo}&angle={angle}", received_at, servo,
+                               {servo: angle})
+                    for servo, angle in pose.items()
+                ))
+                self.poses += 1
+            self.pose_idle.set()
+
+    async def _command_worker(self):
+        while True:
+            action, received_at = await self.commands.get()
+            await asyncio.gather(self.pose_idle.wait(), *(event.wait() for event in self.idle.values()))
+            home = {servo: 90 for servo in SERVOS} if action == "HOME" else None
+            await self._send(f"http://{self.esp32_ip}/command?action={action}", received_at, applied=home)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        stats = {
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "forwarded": self.forwarded,
+            "failed": self.failed,
+            "retried": self.retried,
+            "poses": self.poses,
+            "queue_depth": self.queue_depth,
+            "latency_ms_p50": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+            "latency_ms_max": round(latencies[-1] * 1000, 1) if latencies else None,
+        }
+        if self.breaker:
+            stats.update(self.breaker.stats())
+        return stats
+
+    async def report(self, interval=10.0):
+        """Cetak statistik berkala selama ada aktivitas."""
+        last_received = 0
+        while True:
+            await asyncio.sleep(interval)
+            if self.received != last_received:
+                last_received = self.received
+                log.info("📊 Forwarder", **self.stats())
@@ -0,0 +1,124 @@
+"""
+Kesehatan koneksi ke ESP32.
+
+- CircuitBreaker: setelah `failure_threshold` kegagalan beruntun, sirkuit
+  "open": semua request ke ESP32 langsung ditolak (tanpa menunggu timeout)
+  sampai ESP32 terbukti hidup lagi. Setelah `reset_timeout` detik satu
+  request boleh lewat sebagai percobaan ("half_open"); berhasil = "closed".
+- HealthMonitor: ping berkala ke ESP32 (GET /; jawaban HTTP apa pun berarti
+  hidup). Ping dilewati bila ada request yang baru saja berhasil, dan
+  dipercepat saat ESP32 offline agar pemulihan cepat ketahuan.
+Perubahan online/offline diteruskan ke `listeners` (mis. disiarkan ke web).
+"""
+
+import asyncio
+import time
+
+import aiohttp
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=3, reset_timeout=3.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.last_success = 0.0
+        self.listeners = []       # fn(online) dipanggil saat status online berubah
+
+        # Statistik
+        self.trips = 0
+        self.short_circuited = 0
+
+    @property
+    def online(self):
+        return self.state == "closed"
+
+    def _set(self, state):
+        was_online = self.online
+        self.state = state
+        if self.online != was_online:
+            for listener in self.listeners:
+                listener(self.online)
+
+    def allow(self):
+        """True bila request boleh dikirim ke ESP32."""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._set("half_open")  # Satu request percobaan
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.last_success = time.monotonic()
+        if self.state != "closed":
+            self._set("closed")
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+            if self.state == "closed":
+                self.trips += 1
+            self._set("open")
+
+    def stats(self):
+        return {
+            "esp32_state": self.state,
+            "breaker_trips": self.trips,
+            "short_circuited": self.short_circuited,
+        }
+
+
+class HealthMonitor:
+    def __init__(self, http_session, esp32_ip, breaker, interval=2.0, offline_interval=1.0, timeout=0.5):
+        self.http_session = http_session
+        self.esp32_ip = esp32_ip
+        self.breaker = breaker
+        self.interval = interval                  # Jeda ping saat online
+        self.offline_interval = offline_interval  # Jeda ping saat offline (mencari pemulihan)
+        self.timeout = timeout
+        self.task = None
+        self.pings = 0
+        self.rtt = None                           # Detik, ping terakhir yang berhasil
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+        return self
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+
+    async def ping(self):
+        """True bila ESP32 menjawab. Hasilnya langsung dicatat di breaker."""
+        self.pings += 1
+        start = time.monotonic()
+        try:
+            async with self.http_session.get(f"http://{self.esp32_ip}/",
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
+                await response.read()
+        except Exception:
+            self.breaker.record_failure()
+            return False
+        self.rtt = time.monotonic() - start
+        self.breaker.record_success()
+        return True
+
+    async def _run(self):
+        while True:
+            interval = self.interval if self.breaker.online else self.offline_interval
+            await asyncio.sleep(interval)
+            if self.breaker.online and time.monotonic() - self.breaker.last_success < interval:
+                continue  # Lalu lintas normal sudah membuktikan ESP32 hidup
+            await self.ping()
+
+    def stats(self):
+        return {
+            "pings": self.pings,
+            "ping_ms": round(self.rtt * 1000, 1) if self.rtt is not None else None,
+        }
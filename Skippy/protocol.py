@@ -0,0 +1,114 @@
+"""
+Format pesan WebSocket antara Web.html dan server.py.
+
+Teks (format lama, tetap didukung):
+    "B90,"               satu servo
+    "B90,S45,E30,G10,"   pose
+    "HOME," / "PLAY:2,"  perintah
+    "ACK:B90,S45,"       server -> web: sudut yang sudah diterima ESP32
+
+Biner (subprotocol "skippy.bin.v1", dipilih per koneksi saat handshake):
+    0x01 sendi sudut                 3 byte   gerak satu servo (sendi: 0..3 = B,S,E,G)
+    0x02 mask B S E G                6 byte   pose; bit i di mask = sendi i ikut
+    0x03 teks-ASCII                  1+n byte perintah (HOME, PLAY:2, ...)
+    0x81 mask B S E G                6 byte   server -> web: ACK
+
+Semua pesan diubah ke bentuk yang sama:
+    ("move", "B", 90) / ("pose", {"B": 90, ...}) / ("command", "HOME")
+"""
+
+import re
+import struct
+
+from forwarder import SERVOS
+
+TEXT = "skippy.text"
+BINARY = "skippy.bin.v1"
+SUBPROTOCOLS = [BINARY, TEXT]
+
+SERVO_COMMAND_PATTERN = re.compile(r"([BSEG])(\d+),")
+POSE_PATTERN = re.compile(r"(?:[BSEG]\d+,){2,}")   # Pose: "B90,S45,E30,G10,"
+
+OP_MOVE = 0x01
+OP_POSE = 0x02
+OP_COMMAND = 0x03
+OP_ACK = 0x81
+
+MOVE = struct.Struct("<BBB")
+POSE = struct.Struct("<BB4B")
+
+
+def select_subprotocol(connection, offered):
+    """Pilih format untuk koneksi ini; klien lama tanpa subprotocol tetap diterima (teks)."""
+    for subprotocol in SUBPROTOCOLS:
+        if subprotocol in offered:
+            return subprotocol
+    return None
+
+
+def parse_text(message):
+    """Pesan teks -> bentuk umum, atau None bila kosong."""
+    message = message.strip()
+    if not message:
+        return None
+    if POSE_PATTERN.fullmatch(message):
+        return ("pose", dict(SERVO_COMMAND_PATTERN.findall(message)))
+    match = SERVO_COMMAND_PATTERN.match(message)
+    if match:
+        return ("move", match.group(1), match.group(2))
+    return ("command", message.replace(',', ''))
+
+
+def _unpack_pose(data):
+    _, mask, *angles = POSE.unpack(data)
+    return {servo: angle for i, (servo, angle) in enumerate(zip(SERVOS, angles)) if mask & (1 << i)}
+
+
+def parse_binary(data):
+    """Frame biner -> bentuk umum. ValueError untuk frame yang tidak dikenal."""
+    if not data:
+        return None
+    opcode = data[0]
+    if opcode == OP_MOVE and len(data) == MOVE.size:
+        _, joint, angle = MOVE.unpack(data)
+        if joint < len(SERVOS):
+            return ("move", SERVOS[joint], angle)
+    elif opcode == OP_POSE and len(data) == POSE.size:
+        return ("pose", _unpack_pose(data))
+    elif opcode == OP_COMMAND and len(data) > 1:
+        return ("command", bytes(data[1:]).decode("ascii"))
+    raise ValueError(f"frame biner tidak dikenal: {bytes(data[:8]).hex()}")
+
+
+def parse(message):
+    return parse_text(message) if isinstance(message, str) else parse_binary(message)
+
+
+def _pose_fields(angles):
+    mask = 0
+    values = [0] * len(SERVOS)
+    for servo, angle in angles.items():
+        i = SERVOS.index(servo)
+        mask |= 1 << i
+        values[i] = int(angle)
+    return mask, values
+
+
+def encode_move(servo, angle):
+    return MOVE.pack(OP_MOVE, SERVOS.index(servo), int(angle))
+
+
+def encode_pose(angles):
+    mask, values = _pose_fields(angles)
+    return POSE.pack(OP_POSE, mask, *values)
+
+
+def encode_command(action):
+    return bytes([OP_COMMAND]) + action.encode("ascii")
+
+
+def encode_ack(angles, binary=False):
+    if binary:
+        mask, values = _pose_fields(angles)
+        return POSE.pack(OP_ACK, mask, *values)
+    return "ACK:" + "".join(f"{servo}{angle}," for servo, angle in angles.items())
@@ -0,0 +1,154 @@
+"""
+Rekam & putar ulang sekuens gerakan di sisi server (bukan di memori ESP32).
+
+- SequenceRecorder: REC_START / REC_ADD / REC_STOP dari web. Setiap REC_ADD
+  menyimpan pose saat ini (B, S, E, G) beserta waktunya sejak REC_START.
+  Saat REC_STOP, sekuens disimpan ke file biner ringkas:
+      header  "SKSQ" + versi (1 byte) + jumlah keyframe (2 byte)
+      keyframe waktu float32 + 4 sudut uint8  = 8 byte per keyframe
+- SequencePlayer: PLAY memutar sekuens dengan laju kontrol tetap (mis. 25 Hz),
+  pose di antara keyframe diinterpolasi, kecepatan bisa diskalakan dan
+  pemutaran bisa dibatalkan kapan saja (input manual / tombol Stop).
+"""
+
+import asyncio
+import bisect
+import os
+import struct
+import time
+
+from async_log import get_logger
+from forwarder import SERVOS
+
+MAGIC = b"SKSQ"
+VERSION = 1
+HEADER = struct.Struct("<4sBH")
+KEYFRAME = struct.Struct("<f4B")
+
+log = get_logger("skippy.sequence")
+
+
+def save_sequence(path, keyframes):
+    """keyframes: [(detik, (B, S, E, G)), ...]"""
+    data = bytearray(HEADER.pack(MAGIC, VERSION, len(keyframes)))
+    for t, pose in keyframes:
+        data += KEYFRAME.pack(t, *pose)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)  # File lama tidak rusak bila penyimpanan terputus
+
+
+def load_sequence(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} bukan file sekuens Skippy")
+    return [
+        (t, tuple(pose))
+        for t, *pose in KEYFRAME.iter_unpack(data[HEADER.size:HEADER.size + count * KEYFRAME.size])
+    ]
+
+
+def pose_at(keyframes, t):
+    """Pose (B, S, E, G) pada waktu t, interpolasi linear antar keyframe."""
+    times = [k[0] for k in keyframes]
+    i = bisect.bisect_right(times, t)
+    if i == 0:
+        return keyframes[0][1]
+    if i == len(keyframes):
+        return keyframes[-1][1]
+    (t0, p0), (t1, p1) = keyframes[i - 1], keyframes[i]
+    u = (t - t0) / (t1 - t0) if t1 > t0 else 1.0
+    return tuple(round(a + (b - a) * u) for a, b in zip(p0, p1))
+
+
+class SequenceRecorder:
+    def __init__(self, path=None):
+        self.path = path
+        self.keyframes = []      # Sekuens terakhir (yang diputar oleh PLAY)
+        self.recording = None    # Keyframe yang sedang direkam
+        self.started_at = 0.0
+        if path and os.path.exists(path):
+            try:
+                self.keyframes = load_sequence(path)
+                log.info("📼 Sekuens dimuat", path=path, points=len(self.keyframes))
+            except (OSError, ValueError, struct.error) as e:
+                log.warning("Gagal memuat sekuens", path=path, error=str(e))
+
+    def start(self, now=None):
+        self.recording = []
+        self.started_at = time.monotonic() if now is None else now
+
+    def add(self, angles, now=None):
+        """angles: {"B": 90, ...}. Mengembalikan False bila belum REC_START."""
+        if self.recording is None:
+            return False
+        now = time.monotonic() if now is None else now
+        pose = tuple(max(0, min(180, int(angles[servo]))) for servo in SERVOS)
+        self.recording.append((now - self.started_at, pose))
+        return True
+
+    def stop(self):
+        """Akhiri perekaman; sekuens disimpan bila ada titiknya."""
+        if self.recording is None:
+            return False
+        recorded, self.recording = self.recording, None
+        if not recorded:
+            return False
+        self.keyframes = recorded
+        if self.path:
+            save_sequence(self.path, recorded)
+        return True
+
+
+class SequencePlayer:
+    def __init__(self, forwarder, rate=25.0, approach=1.0):
+        self.forwarder = forwarder
+        self.rate = rate              # Pose per detik yang dikirim saat playback
+        self.approach = approach      # Detik untuk bergerak dari pose sekarang ke titik pertama
+        self.task = None
+
+    @property
+    def playing(self):
+        return self.task is not None and not self.task.done()
+
+    def play(self, keyframes, speed=1.0):
+        self.stop()
+        if not keyframes:
+            return False
+        self.task = asyncio.create_task(self._run(keyframes, max(0.1, speed)))
+        return True
+
+    def stop(self):
+        if self.playing:
+            self.task.cancel()
+            return True
+        return False
+
+    def timeline(self, keyframes):
+        """Sekuens mulai dari pose sekarang, titik pertama dicapai setelah `approach` detik."""
+        start = tuple(int(self.forwarder.angles[servo]) for servo in SERVOS)
+        t_first = keyframes[0][0]
+        return [(0.0, start)] + [(self.approach + t - t_first, pose) for t, pose in keyframes]
+
+    async def _run(self, keyframes, speed):
+        frames = self.timeline(keyframes)
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.rate
+        started = next_tick = loop.time()
+        last = None
+        log.info("▶️ Playback", points=len(keyframes), seconds=round(frames[-1][0] / speed, 1), speed=speed)
+        while True:
+            t = (loop.time() - started) * speed
+            pose = pose_at(frames, t)
+            if pose != last:
+                self.forwarder.set_pose(dict(zip(SERVOS, pose)))
+                last = pose
+            if t >= frames[-1][0]:
+                break
+            # Jadwal absolut: laju kontrol tidak melambat karena waktu proses
+            next_tick += period
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+        log.info("⏹️ Playback selesai")
@@ -1,68 +1,180 @@
 import asyncio
+import logging
 import websockets
 import aiohttp # req
-import re
+
+import protocol
+from async_log import get_logger
+from clients import ClientHub
+from forwarder import CommandForwarder, create_session
+from health import CircuitBreaker, HealthMonitor
+from sequence import SequencePlayer, SequenceRecorder
+from trajectory import TrajectoryStreamer
+
+log = get_logger("skippy.server")   # LOG_LEVEL=DEBUG/INFO/WARNING, LOG_FORMAT=json
 
 ESP32_IP = "192.168.1.150" 
 WEBSOCKET_HOST = "localhost"
 WEBSOCKET_PORT = 8765
 
-SERVO_COMMAND_PATTERN = re.compile(r"([BSEG])(\d+),")
+# Koneksi HTTP ke ESP32
+HTTP_POOL_SIZE = 4        # Koneksi keep-alive maksimal (satu per servo)
+HTTP_KEEPALIVE = 30.0     # Detik koneksi idle tetap dibuka
+CONNECT_TIMEOUT = 0.5     # ESP32 mati/tidak terjangkau cepat ketahuan
+READ_TIMEOUT = 1.5        # Batas menunggu jawaban ESP32
+MOVE_RETRIES = 2          # Percobaan ulang untuk sudut servo yang gagal
+
+# Kesehatan ESP32
+FAILURE_THRESHOLD = 3     # Kegagalan beruntun sebelum ESP32 dianggap offline
+BREAKER_RESET = 3.0       # Detik sebelum satu perintah boleh mencoba lagi saat offline
+HEALTH_INTERVAL = 2.0     # Jeda ping saat online
+OFFLINE_INTERVAL = 1.0    # Jeda ping saat offline (pemulihan cepat ketahuan)
+
+# Rekam & putar ulang (disimpan di server, bukan di ESP32)
+SEQUENCE_FILE = "sequence.sksq"
+PLAYBACK_RATE = 25.0      # Pose per detik saat playback
+
+# Gerakan halus dari slider/pose (False = servo langsung lompat ke target)
+SMOOTH_MOTION = True
+MOTION_PROFILE = "min_jerk"  # min_jerk / trapezoid
+MOTION_RATE = 25.0        # Pose per detik selama bergerak
+MAX_SPEED = 120.0         # derajat/detik
+MAX_ACCEL = 400.0         # derajat/detik^2
+
+# Banyak klien: satu pengendali, sisanya penonton
+ACK_INTERVAL = 0.05       # Siaran sudut terpasang ke web paling sering 20x per detik
+CONTROL_TIMEOUT = 10.0    # Detik diam sebelum kunci pengendali dilepas
+
+def handle_sequence(action, forwarder, recorder, player, streamer=None):
+    """REC_START / REC_ADD / REC_STOP / PLAY[:kecepatan] ditangani server. True bila tertangani."""
+    if action == "REC_START":
+        player.stop()
+        recorder.start()
+        log.info("⏺️ Mulai merekam")
+    elif action == "REC_ADD":
+        # Rekam tujuan gerakan, bukan titik antara lintasan yang sedang berjalan
+        pose = streamer.target if streamer else forwarder.angles
+        if recorder.add(pose):
+            log.info("➕ Titik direkam", point=len(recorder.recording), **pose)
+    elif action == "REC_STOP":
+        if player.stop():
+            log.info("⏹️ Playback dibatalkan")
+        if recorder.stop():
+            log.info("💾 Sekuens disimpan", points=len(recorder.keyframes), path=recorder.path)
+    elif action.startswith("PLAY"):
+        speed = action.partition(":")[2]
+        try:
+            speed = float(speed) if speed else 1.0
+        except ValueError:
+            speed = 1.0
+        if streamer:
+            streamer.stop()
+        if not player.play(recorder.keyframes, speed):
+            log.warning("Belum ada sekuens yang direkam.")
+    else:
+        return False
+    return True
 
-async def connection_handler(websocket, http_session):
-    """Menerima perintah dari web dan meneruskannya ke ESP32 via HTTP GET secara asynchronous."""
-    print(f" Klien terhubung dari {websocket.remote_address}")
+async def connection_handler(websocket, hub, forwarder, recorder, player, streamer=None):
+    """Menerima perintah dari web dan menyerahkannya ke forwarder (tanpa menunggu ESP32)."""
+    client = hub.join(websocket)
+    address = "%s:%s" % websocket.remote_address[:2]
+    log.info("Klien terhubung", client=address, protocol=websocket.subprotocol or protocol.TEXT,
+             clients=len(hub.clients))
     
     try:
         async for message in websocket:
-            message = message.strip()
-            if not message:
+            # Teks ("B90,") atau biner (subprotocol skippy.bin.v1), hasilnya bentuk yang sama
+            try:
+                parsed = protocol.parse(message)
+            except ValueError as e:
+                log.sampled(f"bad:{address}", 1.0, "Pesan tidak dikenal", logging.WARNING,
+                            client=address, error=str(e))
+                continue
+            if parsed is None:
                 continue
 
-            print(f"> Menerima dari Web: '{message}'")
-            
-            match = SERVO_COMMAND_PATTERN.match(message)
+            kind = parsed[0]
+            # Slider live bisa puluhan pesan per detik: cukup satu baris per detik per klien
+            log.sampled(f"rx:{address}", 1.0, "> Menerima dari Web", client=address, command=kind,
+                        value=parsed[1:])
+
+            if kind == "command" and hub.handle(client, parsed[1]):
+                continue
+            if not hub.may_control(client):
+                continue  # Klien lain sedang mengendalikan lengan
             
-            if match:
-                servo_id = match.group(1)
-                angle = match.group(2)
-                url = f"http://{ESP32_IP}/move?servo={servo_id}&angle={angle}"
+            if kind == "pose":
+                # Semua sendi dikirim ke ESP32 dalam satu request /pose
+                player.stop()
+                pose = parsed[1]
+                if streamer:
+                    streamer.move_to(pose)
+                else:
+                    forwarder.set_pose(pose)
+            elif kind == "move":
+                _, servo_id, angle = parsed
+                # Input manual menghentikan playback; sudut lama yang belum terkirim langsung ditimpa
+                player.stop()
+                if streamer:
+                    # Target baru menggantikan lintasan yang sedang berjalan
+                    streamer.move_to({servo_id: angle})
+                else:
+                    forwarder.set_angle(servo_id, angle)
             else:
-                action = message.replace(',', '')
-                url = f"http://{ESP32_IP}/command?action={action}"
-                
-            try:
-                print(f"   -> Mengirim permintaan ke: {url}")
-          
-                async with http_session.get(url, timeout=1.5) as response:
-                    if response.status == 200:
-                        print(f"   <- Respon ESP32: OK")
-                    else:
-                        print(f"   <- Peringatan: Respon ESP32 tidak OK (Status: {response.status})")
-            except Exception as e:
-                print(f"   Gagal terhubung ke ESP32 di {ESP32_IP}.")
+                action = parsed[1]
+                if not handle_sequence(action, forwarder, recorder, player, streamer):
+                    player.stop()
+                    if streamer:
+                        streamer.stop()
+                    forwarder.command(action)
 
 
     except websockets.exceptions.ConnectionClosed:
-        print(f" web terputus.")
+        pass
+    finally:
+        hub.leave(websocket)
+        log.info("Web terputus", client=address, clients=len(hub.clients))
 
 async def main():
     """Fungsi utama untuk memulai server WebSocket dan aiohttp session."""
-    print("🚀 Server Jembatan WiFi (Optimized) siap dijalankan.")
-    print(f"   Meneruskan perintah ke ESP32 di alamat: http://{ESP32_IP}")
+    log.info("🚀 Server Jembatan WiFi (Optimized) siap dijalankan.", esp32=f"http://{ESP32_IP}")
     
 
-    async with aiohttp.ClientSession() as session:
+    async with create_session(HTTP_POOL_SIZE, HTTP_KEEPALIVE, CONNECT_TIMEOUT, READ_TIMEOUT) as session:
 
-        handler = lambda ws: connection_handler(ws, session)
+        breaker = CircuitBreaker(FAILURE_THRESHOLD, BREAKER_RESET)
+        breaker.listeners.append(
+            lambda online: log.info("✅ ESP32 kembali online.") if online
+            else log.warning("⚠️ ESP32 tidak terjangkau, perintah ditolak cepat sampai pulih."))
+        forwarder = CommandForwarder(session, ESP32_IP, retries=MOVE_RETRIES, breaker=breaker).start()
+        monitor = HealthMonitor(session, ESP32_IP, breaker, HEALTH_INTERVAL, OFFLINE_INTERVAL,
+                                CONNECT_TIMEOUT + READ_TIMEOUT).start()
+        recorder = SequenceRecorder(SEQUENCE_FILE)
+        player = SequencePlayer(forwarder, rate=PLAYBACK_RATE)
+        streamer = None
+        if SMOOTH_MOTION:
+            streamer = TrajectoryStreamer(forwarder, MOTION_RATE, MAX_SPEED, MAX_ACCEL, MOTION_PROFILE)
+        hub = ClientHub(forwarder, CONTROL_TIMEOUT, ACK_INTERVAL).start()
+        breaker.listeners.append(hub.set_esp32_online)
+        handler = lambda ws: connection_handler(ws, hub, forwarder, recorder, player, streamer)
         
-        async with websockets.serve(handler, WEBSOCKET_HOST, WEBSOCKET_PORT):
-            print(f"   Server WebSocket berjalan di ws://{WEBSOCKET_HOST}:{WEBSOCKET_PORT}")
-            print("   Buka file index.html di browser Anda.")
-            await asyncio.Future()  
+        async with websockets.serve(handler, WEBSOCKET_HOST, WEBSOCKET_PORT,
+                                    select_subprotocol=protocol.select_subprotocol):
+            log.info("Server WebSocket berjalan. Buka Web.html di browser Anda.",
+                     url=f"ws://{WEBSOCKET_HOST}:{WEBSOCKET_PORT}")
+            try:
+                await asyncio.Future()
+            finally:
+                player.stop()
+                if streamer:
+                    streamer.stop()
+                hub.stop()
+                monitor.stop()
+                await forwarder.stop()
 
 if __name__ == "__main__":
-    print("Pastikan Anda sudah menjalankan 'pip3 install websockets aiohttp'")
+    print("Pastikan Anda sudah menjalankan 'pip3 install websockets aiohttp numpy'")
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -0,0 +1,225 @@
+"""
+Trajektori halus untuk lengan: dari pose sekarang ke pose target.
+
+Slider di Web.html membuat servo melompat langsung ke sudut tujuan. Modul ini
+mengubah target menjadi lintasan bertimestamp yang dikirim dengan laju tetap:
+
+- profil "min_jerk":  s(u) = 10u^3 - 15u^4 + 6u^5 (mulai & berhenti mulus)
+- profil "trapezoid": percepatan konstan, kecepatan konstan, perlambatan
+- semua sendi dihitung sekaligus dengan NumPy dan tiba bersamaan; durasi
+  dipilih dari sendi terjauh agar batas kecepatan/percepatan tidak terlampaui
+- jumlah pesan = durasi x laju, tidak tergantung berapa banyak event slider
+- target baru di tengah gerakan: min_jerk melanjutkan dari kecepatan dan
+  percepatan saat itu (polinomial orde 5), trapezoid mulai dari diam.
+  Durasi lanjutan diperpanjang sampai puncak kecepatan/percepatannya juga
+  di dalam batas. Bila target ada di belakang sendi yang bergerak (atau
+  dalam jarak pengeremannya), lengan direm dulu dengan max_accel sampai
+  diam, lalu min_jerk biasa ke target
+
+  traj = Trajectory((90, 90, 90, 90), (10, 120, 90, 45), max_speed=120, max_accel=400)
+  times, poses = traj.samples(rate=25)     # poses: array (N, 4) derajat
+"""
+
+import asyncio
+
+import numpy as np
+
+from forwarder import SERVOS
+
+PROFILES = ("min_jerk", "trapezoid")
+
+
+def min_jerk(u):
+    u = np.clip(u, 0.0, 1.0)
+    return u ** 3 * (10.0 - 15.0 * u + 6.0 * u ** 2)
+
+
+def trapezoid(u, accel_fraction):
+    """Posisi ternormalisasi 0..1; accel_fraction = bagian waktu untuk mempercepat (<= 0.5)."""
+    u = np.clip(u, 0.0, 1.0)
+    ta = accel_fraction
+    v = 1.0 / (1.0 - ta)                              # Kecepatan puncak ternormalisasi
+    return np.where(
+        u < ta, 0.5 * v / ta * u ** 2,
+        np.where(u > 1.0 - ta, 1.0 - 0.5 * v / ta * (1.0 - u) ** 2, v * (u - 0.5 * ta)),
+    )
+
+
+def quintic(d, v0, a0, T):
+    """Koefisien t^1..t^5: mulai dengan v0 & a0, tiba di d dalam T detik dan berhenti diam."""
+    return np.stack([
+        v0,
+        a0 / 2.0,
+        (20.0 * d - 12.0 * v0 * T - 3.0 * a0 * T ** 2) / (2.0 * T ** 3),
+        (-30.0 * d + 16.0 * v0 * T + 3.0 * a0 * T ** 2) / (2.0 * T ** 4),
+        (12.0 * d - 6.0 * v0 * T - a0 * T ** 2) / (2.0 * T ** 5),
+    ])
+
+
+def quintic_peaks(coeffs, T, points=64):
+    """(|kecepatan| maks, |percepatan| maks) semua sendi, dicuplik sepanjang [0, T]."""
+    t = np.linspace(0.0, T, points)[:, None]
+    c1, c2, c3, c4, c5 = coeffs
+    velocity = c1 + t * (2 * c2 + t * (3 * c3 + t * (4 * c4 + t * 5 * c5)))
+    accel = 2 * c2 + t * (6 * c3 + t * (12 * c4 + t * 20 * c5))
+    return float(np.abs(velocity).max()), float(np.abs(accel).max())
+
+
+class Trajectory:
+    def __init__(self, start, goal, max_speed=120.0, max_accel=400.0, profile="min_jerk",
+                 min_duration=0.05, start_velocity=None, start_acceleration=None):
+        if profile not in PROFILES:
+            raise ValueError(f"profile must be one of {PROFILES}")
+        self.start = np.asarray(start, dtype=np.float64)
+        self.goal = np.asarray(goal, dtype=np.float64)
+        self.profile = profile
+
+        # Fase rem: target di belakang arah gerak atau di dalam jarak pengereman
+        self.brake_time = 0.0
+        self.brake_velocity = None
+        if profile == "min_jerk" and start_velocity is not None:
+            v0 = np.asarray(start_velocity, dtype=np.float64)
+            ahead = (self.goal - self.start) * np.sign(v0)
+            if np.any((np.abs(v0) > 1e-6) & (ahead < v0 ** 2 / (2.0 * max_accel))):
+                self.brake_time = float(np.abs(v0).max()) / max_accel
+                self.brake_velocity = v0
+                self.start = self.start + v0 * self.brake_time / 2.0    # Posisi saat diam
+                start_velocity = start_acceleration = None
+        self.delta = self.goal - self.start
+
+        distance = float(np.abs(self.delta).max(initial=0.0))
+        if profile == "min_jerk":
+            # Puncak min-jerk: kecepatan 1.875 d/T, percepatan 5.774 d/T^2
+            duration = max(1.875 * distance / max_speed, np.sqrt(5.774 * distance / max_accel))
+            self.accel_fraction = None
+        elif distance >= max_speed ** 2 / max_accel:
+            duration = distance / max_speed + max_speed / max_accel
+            self.accel_fraction = (max_speed / max_accel) / duration
+        else:
+            # Jarak pendek: tidak sempat mencapai kecepatan maksimum (profil segitiga)
+            duration = 2.0 * np.sqrt(distance / max_accel)
+            self.accel_fraction = 0.5
+        self.duration = max(float(duration), min_duration)
+        if self.accel_fraction is not None:
+            self.accel_fraction = min(0.5, max(self.accel_fraction, 1e-3))
+
+        # Koefisien orde 5 (min_jerk) dengan kecepatan v0 & percepatan a0 awal, berhenti diam di goal
+        self.coeffs = None
+        if profile == "min_jerk" and start_velocity is not None:
+            v0 = np.asarray(start_velocity, dtype=np.float64)
+            a0 = np.zeros_like(v0) if start_acceleration is None else np.asarray(start_acceleration, np.float64)
+            # Durasi dari jarak saja terlalu pendek bila lengan masih bergerak (mis. berbalik arah):
+            # perpanjang sampai puncaknya di dalam batas (atau tidak melebihi kondisi awal itu sendiri)
+            speed_limit = max(max_speed, float(np.abs(v0).max(initial=0.0))) * 1.01
+            accel_limit = max(max_accel, float(np.abs(a0).max(initial=0.0))) * 1.01
+            T = self.duration
+            for _ in range(60):
+                self.coeffs = quintic(self.delta, v0, a0, T)
+                speed, accel = quintic_peaks(self.coeffs, T)
+                if speed <= speed_limit and accel <= accel_limit:
+                    break
+                T *= 1.1
+            self.duration = T
+        self.motion_duration = self.duration
+        self.duration += self.brake_time
+
+    def sample(self, t):
+        """Pose pada waktu t (skalar atau array) -> array (..., jumlah sendi)."""
+        if self.brake_velocity is None:
+            return self._sample_motion(t)
+        t = np.asarray(t, dtype=np.float64)
+        tb, v0 = self.brake_time, self.brake_velocity
+        braking = np.clip(t, 0.0, tb)[..., None]
+        before = self.start - v0 * tb / 2.0
+        brake = before + v0 * braking - v0 / (2.0 * tb) * braking ** 2
+        return np.where((t < tb)[..., None], brake, self._sample_motion(t - tb))
+
+    def _sample_motion(self, t):
+        if self.coeffs is not None:
+            t = np.clip(np.asarray(t, dtype=np.float64), 0.0, self.motion_duration)[..., None]
+            c1, c2, c3, c4, c5 = self.coeffs
+            return self.start + t * (c1 + t * (c2 + t * (c3 + t * (c4 + t * c5))))
+        u = np.asarray(t, dtype=np.float64) / self.motion_duration
+        s = min_jerk(u) if self.profile == "min_jerk" else trapezoid(u, self.accel_fraction)
+        return self.start + np.multiply.outer(s, self.delta)
+
+    def derivatives(self, t, h=1e-3):
+        """(kecepatan, percepatan) tiap sendi pada waktu t, selisih hingga terpusat."""
+        if t >= self.duration:
+            return np.zeros_like(self.delta), np.zeros_like(self.delta)
+        t = max(t, h)
+        before, now, after = self.sample(np.array([t - h, t, t + h]))
+        return (after - before) / (2.0 * h), (after - 2.0 * now + before) / h ** 2
+
+    def samples(self, rate):
+        """Titik-titik lintasan dengan laju `rate` Hz, termasuk titik awal dan akhir."""
+        count = max(2, int(np.ceil(self.duration * rate)) + 1)
+        times = np.linspace(0.0, self.duration, count)
+        return times, self.sample(times)
+
+
+class TrajectoryStreamer:
+    """Mengirim lintasan halus ke forwarder; target baru menggantikan lintasan yang sedang berjalan."""
+
+    def __init__(self, forwarder, rate=25.0, max_speed=120.0, max_accel=400.0, profile="min_jerk"):
+        self.forwarder = forwarder
+        self.rate = rate
+        self.max_speed = max_speed    # derajat/detik
+        self.max_accel = max_accel    # derajat/detik^2
+        self.profile = profile
+        self.goal = None
+        self.task = None
+        self.trajectory = None
+        self.started = 0.0
+        self.streamed = 0             # Pose yang dikirim ke forwarder
+
+    @property
+    def moving(self):
+        return self.task is not None and not self.task.done()
+
+    @property
+    def target(self):
+        """Pose tujuan: target lintasan yang berjalan, atau pose terakhir yang diperintahkan."""
+        return dict(self.goal) if self.moving else dict(self.forwarder.angles)
+
+    def move_to(self, angles):
+        """angles: {"B": 45, ...}; sendi yang tidak disebut tetap di targetnya."""
+        goal = self.target
+        goal.update({servo: int(angle) for servo, angle in angles.items()})
+        now = asyncio.get_running_loop().time()
+        if self.stop():
+            # Lanjutkan dari posisi & kecepatan lintasan yang sedang berjalan
+            elapsed = now - self.started
+            start = self.trajectory.sample(elapsed)
+            velocity, acceleration = self.trajectory.derivatives(elapsed)
+        else:
+            # Mulai dari pose yang terakhir dikirim (posisi lengan saat ini)
+            start = [self.forwarder.angles[servo] for servo in SERVOS]
+            velocity = acceleration = None
+        self.trajectory = Trajectory(start, [goal[servo] for servo in SERVOS],
+                                     self.max_speed, self.max_accel, self.profile,
+                                     start_velocity=velocity, start_acceleration=acceleration)
+        self.goal = goal
+        self.started = now
+        self.task = asyncio.create_task(self._run(self.trajectory, now))
+        return self.trajectory
+
+    def stop(self):
+        if self.moving:
+            self.task.cancel()
+            return True
+        return False
+
+    async def _run(self, trajectory, started):
+        times, poses = trajectory.samples(self.rate)
+        poses = np.clip(np.rint(poses), 0, 180).astype(int)
+        loop = asyncio.get_running_loop()
+        last = [self.forwarder.angles[servo] for servo in SERVOS]
+        for t, pose in zip(times, poses):
+            await asyncio.sleep(max(0.0, started + t - loop.time()))
+            # Kirim hanya sendi yang berubah
+            changed = {servo: int(a) for servo, a, b in zip(SERVOS, pose, last) if a != b}
+            if changed:
+                self.forwarder.set_pose(changed)
+                self.streamed += 1
+            last = pose